@@ -0,0 +1,990 @@
+"""Анализатор выражений грамматики G[<E>] без графического интерфейса.
+
+Этапы: лексический анализ с поиском невалидных фрагментов, синтаксический
+анализ (LL(1) с явным стеком), перевод в ПОЛИЗ, компиляция ПОЛИЗ в
+байт-код и его вычисление на стековой машине.
+"""
+import hashlib
+import re
+import sys
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+
+
+# === Лексический анализ за один проход ===
+Token = namedtuple("Token", "kind value offset line column")
+
+TOKEN_PATTERNS = (
+    r"(?P<num>[0-9]+)"
+    r"|(?P<op>[-+*/])"
+    r"|(?P<lparen>\()"
+    r"|(?P<rparen>\))"
+    r"|(?P<newline>\n)"
+    r"|(?P<space>[^\S\n]+)"
+)
+# Подряд идущие невалидные символы образуют один фрагмент
+TOKEN_RE = re.compile(TOKEN_PATTERNS + r"|(?P<invalid>[^0-9+\-*/()\s]+)")
+# Вариант с идентификаторами-переменными: O → num | id | (E)
+TOKEN_RE_IDENT = re.compile(
+    TOKEN_PATTERNS + r"|(?P<id>[A-Za-z_][A-Za-z0-9_]*)|(?P<invalid>[^0-9A-Za-z_+\-*/()\s]+)"
+)
+
+
+def lex(text, identifiers=False):
+    """Генератор токенов с позициями: Token(kind, value, offset, line, column).
+
+    Невалидные фрагменты (цепочки недопустимых символов) отдаются в том
+    же проходе токенами вида 'invalid', пробелы и переводы строк
+    пропускаются. Строки и столбцы нумеруются с 1.
+    При identifiers=True имена переменных отдаются токенами вида 'id'.
+    """
+    line = 1
+    line_start = 0
+    token_re = TOKEN_RE_IDENT if identifiers else TOKEN_RE
+    for m in token_re.finditer(text):
+        kind = m.lastgroup
+        if kind == 'space':
+            continue
+        offset = m.start()
+        if kind == 'newline':
+            line += 1
+            line_start = offset + 1
+            continue
+        yield Token(kind, m.group(), offset, line, offset - line_start + 1)
+
+
+def tokenize(expr):
+    """Список значений токенов (невалидные символы - отдельными токенами)."""
+    return [token.value for token in lex(expr)]
+
+
+# === Синтаксический анализатор (LL(1) с явным стеком) ===
+# Маркер конца выражения в Parser.tokens. Лексер не выдаёт его как токен
+# выражения, поэтому он не совпадает с переменной по имени EOF
+END = '\0EOF'
+# Точки синхронизации при восстановлении после ошибки
+SYNC_TOKENS = frozenset((')', '+', '-', '*', '/', END))
+# Лимит ошибок на выражение: после него разбор прекращается
+MAX_ERRORS = 100
+# Лимит строк диагностики на документ из нескольких выражений
+MAX_DOCUMENT_ERRORS = 10000
+
+
+class Parser:
+    """Разбор грамматики G[<E>] без рекурсии.
+
+    Правила E → TA, A → ε | +TA | -TA, T → OB, B → ε | *OB | /OB,
+    O → num | (E) раскрываются на явном стеке символов, поэтому глубина
+    вложенности и длина цепочек операций ограничены только памятью.
+    При identifiers=True операндом O может быть также имя переменной.
+
+    Восстановление после ошибок - режим паники: не подходящие ни к одному
+    правилу токены пропускаются до точки синхронизации (')', знак операции
+    или конец выражения), сами эти токены не съедаются и разбираются
+    дальше по правилам. Если вместо ')' стоит операнд, ошибка записывается
+    и разбор E продолжается с этого операнда внутри скобок (если скобка так
+    и не закрыта до конца выражения, второй раз об этом не сообщается). Если E
+    разобрано до конца выражения, остаток - лишний токен: лишняя ')' и
+    знаки операций за ней пропускаются, и разбор E начинается заново со
+    следующего операнда. Пока после ошибки не разобран операнд или ')',
+    новые ошибки считаются наведёнными и не записываются. Первая ошибка
+    совпадает с рекурсивным спуском. После max_errors ошибок разбор
+    прекращается.
+    """
+
+    def __init__(self, tokens, identifiers=False, max_errors=MAX_ERRORS):
+        self.tokens = tokens + [END]
+        self.pos = 0
+        self.errors = []
+        # Для каждой ошибки - номер токена, на котором она найдена (len(tokens) - конец выражения)
+        self.positions = []
+        self.identifiers = identifiers
+        self.max_errors = max_errors
+        self.aborted = False
+
+    def current(self):
+        return self.tokens[self.pos]
+
+    def match(self, expected):
+        if self.current() == expected:
+            self.pos += 1
+            return True
+        return False
+
+    def is_operand(self, token):
+        return token.isdigit() or token == '(' or (self.identifiers and token.isidentifier())
+
+    def report(self, message, pos):
+        """Запись ошибки на токене pos; True, если исчерпан лимит ошибок."""
+        self.errors.append(message)
+        self.positions.append(pos)
+        return len(self.errors) >= self.max_errors
+
+    def skip_to_operand(self, pos, last):
+        """Позиция ближайшего операнда (или конца выражения) начиная с pos."""
+        tokens = self.tokens
+        while pos < last and not self.is_operand(tokens[pos]):
+            pos += 1
+        return pos
+
+    def parse(self):
+        tokens = self.tokens
+        identifiers = self.identifiers
+        last = len(tokens) - 1  # позиция END
+        pos = self.pos
+        # Режим паники: ошибки до следующего разобранного операнда не записываются
+        recovering = False
+        aborted = False
+        # ')' на стеке - ожидание закрывающей скобки после O → (E); '?)' - той же
+        # скобки после ошибки: о том, что она не закрыта до конца, уже сообщено
+        stack = ['E']
+        while True:
+            if not stack:
+                if pos >= last:
+                    break
+                # E разобрано, а выражение не кончилось
+                if not recovering:
+                    aborted = self.report(f"лишний токен: '{tokens[pos]}'", pos)
+                    if aborted:
+                        break
+                recovering = True
+                pos = self.skip_to_operand(pos, last)
+                if pos < last:
+                    stack.append('E')
+                continue
+            symbol = stack.pop()
+            current = tokens[pos]
+            if symbol == 'E':
+                stack.append('A')
+                stack.append('T')
+            elif symbol == 'T':
+                stack.append('B')
+                stack.append('O')
+            elif symbol == 'A':
+                if current == '+' or current == '-':
+                    pos += 1
+                    stack.append('A')
+                    stack.append('T')
+            elif symbol == 'B':
+                if current == '*' or current == '/':
+                    pos += 1
+                    stack.append('B')
+                    stack.append('O')
+            elif symbol == 'O':
+                if current.isdigit():
+                    pos += 1
+                    recovering = False
+                elif identifiers and pos < last and current.isidentifier():
+                    pos += 1
+                    recovering = False
+                elif current == '(':
+                    pos += 1
+                    recovering = False
+                    stack.append(')')
+                    stack.append('E')
+                else:
+                    if not recovering:
+                        recovering = True
+                        found = 'EOF' if pos == last else current
+                        aborted = self.report(f"ожидался 'num' или '(', найдено: '{found}'", pos)
+                        if aborted:
+                            break
+                    # Пропуск до точки синхронизации или до нового операнда
+                    skipped = False
+                    while pos < last and tokens[pos] not in SYNC_TOKENS and not self.is_operand(tokens[pos]):
+                        pos += 1
+                        skipped = True
+                    if skipped and pos < last and self.is_operand(tokens[pos]):
+                        stack.append('O')
+            elif current == ')':
+                pos += 1
+                recovering = False
+            else:
+                if not recovering and (symbol == ')' or pos < last):
+                    recovering = True
+                    aborted = self.report("ожидалась закрывающая скобка ')'", pos)
+                    if aborted:
+                        break
+                # Скобка по-прежнему открыта: E разбирается дальше со следующего операнда
+                pos = self.skip_to_operand(pos, last)
+                if pos < last:
+                    stack.append('?)')
+                    stack.append('E')
+        self.pos = pos
+        self.aborted = aborted
+        if aborted:
+            self.errors.append("слишком много ошибок, разбор прекращён")
+            self.positions.append(pos)
+
+
+# === Преобразование в ПОЛИЗ ===
+def to_poliz(tokens):
+    output = []
+    stack = []
+    precedence = {'+': 1, '-': 1, '*': 2, '/': 2}
+    for token in tokens:
+        if token.isdigit():
+            output.append(token)
+        elif token in '+-*/':
+            while stack and stack[-1] != '(' and precedence.get(stack[-1], 0) >= precedence[token]:
+                output.append(stack.pop())
+            stack.append(token)
+        elif token == '(':
+            stack.append(token)
+        elif token == ')':
+            while stack and stack[-1] != '(':
+                output.append(stack.pop())
+            if stack and stack[-1] == '(':
+                stack.pop()
+        elif token.isidentifier():
+            output.append(token)
+    while stack:
+        output.append(stack.pop())
+    return output
+
+
+# === Оптимизация ПОЛИЗ ===
+# Узлы дерева выражения: ('c', значение) - константа, ('v', имя) -
+# переменная, (операция, левый, правый, risky) - операция; risky - есть ли
+# в поддереве деление или переменная, то есть может ли его вычисление
+# завершиться ошибкой (делением на ноль или незаданной переменной).
+def is_number(token):
+    """Число в ПОЛИЗ: цепочка цифр или, после оптимизации, отрицательная константа."""
+    return token.isdigit() or (token[:1] == '-' and token[1:].isdigit())
+
+
+def is_const(node, value=None):
+    return node[0] == 'c' and (value is None or node[1] == value)
+
+
+def is_risky(node):
+    return node[0] == 'v' or (len(node) == 4 and node[3])
+
+
+def make_op(op, left, right):
+    return (op, left, right, op == '/' or is_risky(left) or is_risky(right))
+
+
+def fold(op, left, right):
+    """Свёртка констант, алгебраические тождества и объединение констант в цепочках."""
+    if is_const(left) and is_const(right):
+        a, b = left[1], right[1]
+        if op == '+':
+            return ('c', a + b)
+        if op == '-':
+            return ('c', a - b)
+        if op == '*':
+            return ('c', a * b)
+        if b != 0:  # деление на ноль остаётся до вычисления
+            return ('c', a // b)
+        return make_op(op, left, right)
+
+    # Константу коммутативной операции - вправо: c + x → x + c, c * x → x * c
+    if op in '+*' and is_const(left):
+        left, right = right, left
+
+    if op in '+-' and is_const(right):
+        c = right[1] if op == '+' else -right[1]
+        # (x ± c1) ± c2 → x ± (±c1 ± c2)
+        if left[0] in '+-' and len(left) == 4 and is_const(left[2]):
+            c += left[2][1] if left[0] == '+' else -left[2][1]
+            left = left[1]
+        if c == 0:
+            return left
+        return make_op('+', left, ('c', c)) if c > 0 else make_op('-', left, ('c', -c))
+
+    if op == '*' and is_const(right):
+        c = right[1]
+        # (x * c1) * c2 → x * (c1 * c2)
+        if left[0] == '*' and is_const(left[2]):
+            c *= left[2][1]
+            left = left[1]
+        if c == 1:
+            return left
+        if c == 0 and not is_risky(left):
+            return ('c', 0)
+        return make_op('*', left, ('c', c))
+
+    if op == '/' and is_const(right) and right[1] > 0:
+        c = right[1]
+        # (x / c1) / c2 → x / (c1 * c2) при c1, c2 > 0
+        if left[0] == '/' and is_const(left[2]) and left[2][1] > 0:
+            c *= left[2][1]
+            left = left[1]
+        if c == 1:
+            return left
+        return make_op('/', left, ('c', c))
+
+    return make_op(op, left, right)
+
+
+def optimize_poliz(poliz):
+    """Оптимизированная ПОЛИЗ, вычисляющая то же значение.
+
+    Свёртываются константные подвыражения (кроме деления на ноль, которое
+    должно произойти при вычислении), применяются тождества x+0, x-0, x*1,
+    x/1 и x*0 (последнее - только если x не содержит деления и переменных
+    и не может завершиться ошибкой), константы в цепочках одной операции
+    объединяются. Деление везде целочисленное с округлением вниз, как в
+    run_program. Дерево строится и обходится без рекурсии.
+    """
+    stack = []
+    for token in poliz:
+        if is_number(token):
+            stack.append(('c', int(token)))
+        elif token in OPCODES:
+            if len(stack) < 2:
+                raise ValueError("Недостаточно операндов для операции")
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(fold(token, left, right))
+        elif token.isidentifier():
+            stack.append(('v', token))
+        else:
+            raise ValueError(f"Неверный токен: {token}")
+    if len(stack) != 1:
+        raise ValueError("Некорректное выражение")
+
+    output = []
+    pending = [(stack[0], False)]
+    while pending:
+        node, expanded = pending.pop()
+        if node[0] in ('c', 'v'):
+            output.append(str(node[1]))
+        elif expanded:
+            output.append(node[0])
+        else:
+            pending.append((node, True))
+            pending.append((node[2], False))
+            pending.append((node[1], False))
+    return output
+
+
+# === Компиляция ПОЛИЗ в байт-код ===
+# Команда - одно целое число: неотрицательное - индекс в пуле констант
+# (положить константу на стек), от -1 до -4 - код операции, OP_LOAD и
+# меньше - загрузка переменной с индексом OP_LOAD - команда.
+OP_ADD = -1
+OP_SUB = -2
+OP_MUL = -3
+OP_DIV = -4
+OP_LOAD = -5
+OPCODES = {'+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV}
+
+Program = namedtuple("Program", "code consts names")
+
+
+def compile_poliz(poliz):
+    """Компиляция ПОЛИЗ в Program(code, consts, names) для многократного вычисления.
+
+    Глубина стека проверяется при компиляции, поэтому виртуальная машина
+    выполняет команды без проверок.
+    """
+    code = array('q')
+    consts = []
+    const_index = {}
+    names = []
+    name_index = {}
+    depth = 0
+    for token in poliz:
+        if is_number(token):
+            value = int(token)
+            index = const_index.get(value)
+            if index is None:
+                index = const_index[value] = len(consts)
+                consts.append(value)
+            code.append(index)
+            depth += 1
+        elif token in OPCODES:
+            if depth < 2:
+                raise ValueError("Недостаточно операндов для операции")
+            code.append(OPCODES[token])
+            depth -= 1
+        elif token.isidentifier():
+            index = name_index.get(token)
+            if index is None:
+                index = name_index[token] = len(names)
+                names.append(token)
+            code.append(OP_LOAD - index)
+            depth += 1
+        else:
+            raise ValueError(f"Неверный токен: {token}")
+    if depth != 1:
+        raise ValueError("Некорректное выражение")
+    return Program(code, tuple(consts), tuple(names))
+
+
+def bind_variables(program, variables):
+    """Значения переменных программы в порядке program.names."""
+    missing = [name for name in program.names if name not in variables]
+    if missing:
+        raise ValueError(f"Не заданы значения переменных: {', '.join(missing)}")
+    return [variables[name] for name in program.names]
+
+
+# === Стековая виртуальная машина ===
+def run_program(program, variables=None):
+    consts = program.consts
+    values = bind_variables(program, variables or {}) if program.names else ()
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    try:
+        for op in program.code:
+            if op >= 0:
+                push(consts[op])
+            elif op <= OP_LOAD:
+                push(values[OP_LOAD - op])
+            else:
+                b = pop()
+                if op == OP_ADD:
+                    stack[-1] += b
+                elif op == OP_SUB:
+                    stack[-1] -= b
+                elif op == OP_MUL:
+                    stack[-1] *= b
+                else:
+                    stack[-1] //= b
+    except ZeroDivisionError:
+        raise ZeroDivisionError("Деление на ноль") from None
+    return stack[0]
+
+
+# === Векторное вычисление по столбцам NumPy ===
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def evaluate_columns(program, columns, int64=True):
+    """Вычисление программы сразу для всех строк набора данных.
+
+    columns - словарь имя переменной → одномерный массив NumPy (или
+    последовательность). Стековые операции выполняются над целыми
+    массивами, результат - массив той же длины. Деление - целочисленное с
+    округлением вниз, как в run_program; нулевой делитель в любой строке -
+    ZeroDivisionError.
+
+    Целочисленные столбцы сначала вычисляются в int64 с проверкой
+    переполнения после каждой операции; если оно случилось (или константа
+    не помещается в 64 бита), вычисление повторяется над целыми Python
+    (dtype=object), и результат совпадает с run_program. int64=False
+    сразу выбирает этот режим.
+    """
+    import numpy as np
+
+    values = [np.asarray(column) for column in bind_variables(program, columns)]
+    length = len(values[0]) if values else len(next(iter(columns.values()), ()))
+
+    if int64 and fits_int64(np, program, values):
+        try:
+            return run_columns(np, program, [column.astype(np.int64, copy=False) for column in values],
+                               length, checked=True)
+        except OverflowError:
+            pass
+    values = [column.astype(object) if column.dtype.kind in 'iu' else column for column in values]
+    return run_columns(np, program, values, length, checked=False)
+
+
+def fits_int64(np, program, values):
+    """Можно ли начать вычисление в int64: целые столбцы и константы в пределах 64 бит."""
+    if any(not INT64_MIN <= value <= INT64_MAX for value in program.consts):
+        return False
+    for column in values:
+        if column.dtype.kind == 'u' and column.dtype.itemsize == 8 and column.size and column.max() > INT64_MAX:
+            return False
+        if column.dtype.kind not in 'iu':
+            return False
+    return True
+
+
+def run_columns(np, program, values, length, checked):
+    """Стековая машина над массивами; при checked - int64 и OverflowError при переполнении.
+
+    Операции записаны операторами Python, чтобы константные операнды в
+    режиме без проверки оставались целыми Python произвольной длины.
+    """
+    consts = [np.int64(value) for value in program.consts] if checked else program.consts
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    with np.errstate(over='ignore'):
+        for op in program.code:
+            if op >= 0:
+                push(consts[op])
+            elif op <= OP_LOAD:
+                push(values[OP_LOAD - op])
+            else:
+                b = pop()
+                a = pop()
+                if op == OP_ADD:
+                    result = a + b
+                    if checked and np.any(((a ^ result) & (b ^ result)) < 0):
+                        raise OverflowError
+                elif op == OP_SUB:
+                    result = a - b
+                    if checked and np.any(((a ^ b) & (a ^ result)) < 0):
+                        raise OverflowError
+                elif op == OP_MUL:
+                    result = a * b
+                    if checked:
+                        # Без переполнения result // a == b точно; MIN * -1 проверяется отдельно
+                        nonzero = a != 0
+                        wrong = np.floor_divide(result, np.where(nonzero, a, 1)) != b
+                        if np.any(nonzero & (wrong | ((a == -1) & (b == INT64_MIN)))):
+                            raise OverflowError
+                else:
+                    if np.any(np.asarray(b) == 0):
+                        raise ZeroDivisionError("Деление на ноль")
+                    if checked and np.any((a == INT64_MIN) & (b == -1)):
+                        raise OverflowError
+                    result = a // b
+                push(result)
+
+    result = np.asarray(stack[0])
+    if result.ndim == 0:
+        result = np.full(length, result[()], dtype=result.dtype)
+    return result
+
+
+# === Оценка ПОЛИЗ ===
+def evaluate_poliz(poliz, variables=None):
+    return run_program(compile_poliz(poliz), variables)
+
+
+def compile_expression(text, identifiers=True, optimize=True):
+    """Разбор и компиляция выражения; при ошибках - ValueError с их перечнем.
+
+    При optimize=True ПОЛИЗ перед компиляцией проходит optimize_poliz.
+    """
+    tokens = []
+    errors = []
+    for token in lex(text, identifiers):
+        if token.kind == 'invalid':
+            errors.append(f"невалидный фрагмент '{token.value}' (строка {token.line}, столбец {token.column})")
+        else:
+            tokens.append(token.value)
+    parser = Parser(tokens, identifiers)
+    parser.parse()
+    errors.extend(parser.errors)
+    if errors:
+        raise ValueError("; ".join(errors))
+    poliz = to_poliz(tokens)
+    return compile_poliz(optimize_poliz(poliz) if optimize else poliz)
+
+
+# === Кэш результатов анализа ===
+class AnalysisCache:
+    """Ограниченный LRU-кэш результатов analyze.
+
+    Ключ - хэш нормализованного потока токенов (без пробелов и позиций),
+    поэтому выражения, отличающиеся только форматированием, разделяют
+    одну запись. Хранятся диагностика, ПОЛИЗ и результат вычисления.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()  # кэш общий для окна и фонового анализа
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(tokens, invalid_fragments, variables=None):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\x1f".join(tokens).encode("utf-8"))
+        digest.update(b"\x1e")
+        digest.update("\x1f".join(fragment.value for fragment in invalid_fragments).encode("utf-8"))
+        if variables is not None:
+            digest.update(b"\x1e")
+            digest.update(repr(sorted(variables.items())).encode("utf-8"))
+        return digest.digest()
+
+    def get(self, key):
+        with self.lock:
+            analysis = self.entries.get(key)
+            if analysis is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return analysis
+
+    def put(self, key, analysis):
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = analysis
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def with_location(analysis, file_path, line=1):
+    """Копия результата анализа с другими файлом и строкой в строках диагностики."""
+    diagnostics = [row[:4] + (file_path, f"{line}") for row in analysis["diagnostics"]]
+    return dict(analysis, diagnostics=diagnostics)
+
+
+# Названия столбцов строки диагностики (для JSON и CSV)
+COLUMNS = ("code", "type", "lexeme", "position", "file_path", "line")
+
+
+def error_rows(analysis, file_path, line=1):
+    """Строки диагностики вместе с ошибкой вычисления (E003), если она есть."""
+    rows = list(analysis["diagnostics"])
+    if analysis["error"] is not None:
+        rows.append(("E003", "Ошибка вычисления", analysis["error"], "1", file_path, f"{line}"))
+    return rows
+
+
+def json_result(analysis):
+    """Результат и ошибка вычисления для вывода в JSON.
+
+    Целое длиннее sys.get_int_max_str_digits() цифр Python не переводит в
+    текст, поэтому вместо такого результата возвращается ошибка.
+    """
+    result = analysis["result"]
+    if isinstance(result, int):
+        try:
+            str(result)
+        except ValueError:
+            return None, f"результат длиннее {sys.get_int_max_str_digits()} цифр"
+    return result, analysis["error"]
+
+
+def limit_rows(rows, limit, total, file_path, line=1, aborted=False):
+    """Не больше limit строк диагностики; об отброшенных сообщает строка E004.
+
+    aborted - разбор прекращён по лимиту, и total - не полное число ошибок.
+    """
+    if total <= limit:
+        return rows
+    rows = rows[:limit]
+    summary = f"показано {limit}, разбор прекращён" if aborted else f"показано {limit} из {total}"
+    rows.append(("E004", "Превышен лимит ошибок", summary, f"{limit + 1}", file_path, f"{line}"))
+    return rows
+
+
+# === Полный прогон анализа ===
+def analyze(text, file_path="Без имени", variables=None, cache=None, line=1, profiler=None, cancelled=None):
+    """Анализ текста: строки диагностики в формате таблицы вывода, ПОЛИЗ и результат.
+
+    Каждая строка диагностики - кортеж (код, тип, лексема, позиция, файл, строка).
+    line - номер строки документа, с которой начинается текст.
+    Если переданы variables, в выражении разрешены переменные с этими значениями.
+    С cache (AnalysisCache) повторные выражения не разбираются заново;
+    ПОЛИЗ из кэша общий для всех попаданий, изменять его нельзя.
+    С profiler (profiling.StageProfiler) замеряется каждый этап.
+    cancelled() проверяется между этапами; если он сообщил об отмене,
+    возвращается None.
+    """
+    identifiers = variables is not None
+    tokens = []
+    invalid_fragments = []
+    if profiler is not None:
+        profiler.start("lex")
+    for token in lex(text, identifiers):
+        if token.kind == 'invalid':
+            invalid_fragments.append(token)
+        else:
+            tokens.append(token.value)
+    if profiler is not None:
+        profiler.stop(len(tokens) + len(invalid_fragments))
+    if cancelled is not None and cancelled():
+        return None
+
+    key = None
+    if cache is not None:
+        if profiler is not None:
+            profiler.start("cache")
+        key = cache.make_key(tokens, invalid_fragments, variables)
+        cached = cache.get(key)
+        if profiler is not None:
+            profiler.stop()
+        if cached is not None:
+            return with_location(cached, file_path, line)
+
+    if profiler is not None:
+        profiler.start("parse")
+    parser = Parser(tokens, identifiers)
+    parser.parse()
+    if profiler is not None:
+        profiler.stop(len(tokens))
+    if cancelled is not None and cancelled():
+        return None
+
+    diagnostics = []
+    for idx, fragment in enumerate(invalid_fragments[:MAX_ERRORS], start=1):
+        diagnostics.append(("E001", "невалидный фрагмент", fragment.value, f"{idx}", file_path, f"{line}"))
+    for idx, err in enumerate(parser.errors, start=1):
+        diagnostics.append(("E002", "Синтаксическая ошибка", err, f"{idx}", file_path, f"{line}"))
+    total = len(invalid_fragments) + len(parser.errors)
+    diagnostics = limit_rows(diagnostics, MAX_ERRORS, total, file_path, line, parser.aborted)
+
+    poliz = None
+    result = None
+    error = None
+    if not diagnostics:
+        if profiler is not None:
+            profiler.start("poliz")
+        poliz = to_poliz(parser.tokens[:-1])  # Без маркера конца END
+        if profiler is not None:
+            profiler.stop(len(poliz))
+            profiler.start("evaluate")
+        try:
+            result = evaluate_poliz(poliz, variables)
+        except Exception as e:
+            error = str(e)
+        if profiler is not None:
+            profiler.stop(len(poliz))
+
+    analysis = {
+        "diagnostics": diagnostics,
+        "poliz": poliz,
+        "result": result,
+        "error": error,
+    }
+    if cache is not None:
+        cache.put(key, analysis)
+        analysis = with_location(analysis, file_path, line)
+    return analysis
+
+
+# === Документ из независимых операторов ===
+STATEMENT_SPLITS = ("line", "statement")
+
+
+def split_statements(text, split="line"):
+    """Непустые операторы документа: пары (номер строки, текст).
+
+    split="line" - оператором считается каждая строка; split="statement" -
+    каждый фрагмент, завершённый ';' (он может занимать несколько строк,
+    номер строки берётся по его первому непробельному символу).
+    """
+    if split == "line":
+        for line, statement in enumerate(text.split("\n"), start=1):
+            if statement.strip():
+                yield line, statement
+        return
+
+    line = 1
+    for statement in text.split(";"):
+        stripped = statement.lstrip()
+        if stripped:
+            yield line + statement.count("\n", 0, len(statement) - len(stripped)), statement
+        line += statement.count("\n")
+
+
+# Наибольшая длина оператора при потоковом чтении, символов
+MAX_STATEMENT_LENGTH = 1 << 20
+
+
+def read_parts(stream, separator, block_size):
+    """Куски потока между разделителями: пары (кусок, завершён ли им оператор)."""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            yield "", True
+            return
+        parts = block.split(separator)
+        for part in parts[:-1]:
+            yield part, True
+        if parts[-1]:
+            yield parts[-1], False
+
+
+def stream_statements(stream, split="line", block_size=1 << 16, max_length=MAX_STATEMENT_LENGTH):
+    """Непустые операторы текстового потока по мере чтения: пары (номер строки, текст).
+
+    То же, что split_statements, но поток читается блоками по block_size,
+    и в памяти держится только текущий оператор. Оператор длиннее
+    max_length не накапливается: до конца он пропускается и отдаётся
+    с текстом None.
+    """
+    separator = "\n" if split == "line" else ";"
+    line = 1
+    pieces = []
+    length = 0
+    newlines = 0
+    for part, complete in read_parts(stream, separator, block_size):
+        if length <= max_length:
+            pieces.append(part)
+        length += len(part)
+        if separator != "\n":
+            newlines += part.count("\n")
+        if not complete:
+            continue
+
+        statement = "".join(pieces)
+        stripped = statement.lstrip()
+        if stripped or length > max_length:
+            start = line + statement.count("\n", 0, len(statement) - len(stripped))
+            yield start, statement if length <= max_length else None
+        line += newlines if separator != "\n" else 1
+        pieces = []
+        length = 0
+        newlines = 0
+
+
+# Кэш анализа текущего процесса (задаётся init_process_cache): в пуле - свой
+# у каждого рабочего процесса, в check.py, сервисе и редакторе - общий для
+# всех запусков анализа в процессе
+process_cache = None
+
+
+def init_process_cache(size=4096):
+    """Новый кэш процесса (при size=0 - без кэша); годится как initializer пула."""
+    global process_cache
+    process_cache = AnalysisCache(size) if size > 0 else None
+    return process_cache
+
+
+def analyze_chunk(statements, file_path="Без имени"):
+    """Анализ пачки операторов (номер строки, текст) в рабочем процессе."""
+    return [analyze(text, file_path, cache=process_cache, line=line) for line, text in statements]
+
+
+def analyze_statements(statements, file_path="Без имени", cache=None, executor=None,
+                       chunk_size=512, cancelled=None, profiler=None):
+    """Анализ независимых операторов: список (номер строки, анализ) в их порядке.
+
+    С executor (пул процессов) операторы делятся на пачки по chunk_size и
+    разбираются параллельно, а результаты собираются в исходном порядке;
+    если пачка одна, анализ идёт в текущем процессе с cache.
+    Возвращает None, если cancelled() сообщил об отмене.
+    profiler в текущем процессе замеряет этапы каждого оператора, а при
+    разборе в пуле - только общее время.
+    """
+    statements = list(statements)
+    if executor is None or len(statements) <= chunk_size:
+        analyses = []
+        for count, (line, text) in enumerate(statements):
+            if cancelled is not None and count % 256 == 0 and cancelled():
+                return None
+            analyses.append((line, analyze(text, file_path, cache=cache, line=line, profiler=profiler)))
+        return analyses
+
+    if profiler is not None:
+        profiler.start("statements")
+
+    chunks = [statements[start:start + chunk_size] for start in range(0, len(statements), chunk_size)]
+    futures = [executor.submit(analyze_chunk, chunk, file_path) for chunk in chunks]
+    analyses = []
+    for chunk, future in zip(chunks, futures):
+        if cancelled is not None and cancelled():
+            for pending in futures:
+                pending.cancel()
+            return None
+        analyses.extend(zip([line for line, _ in chunk], future.result()))
+    if profiler is not None:
+        profiler.stop(len(statements))
+    return analyses
+
+
+def statement_rows(analyses, file_path="Без имени", limit=MAX_DOCUMENT_ERRORS):
+    """Строки диагностики всех операторов с их номерами строк, не больше limit на документ."""
+    rows = []
+    total = 0
+    for line, analysis in analyses:
+        if analysis["diagnostics"] or analysis["error"] is not None:
+            found = error_rows(analysis, file_path, line)
+            total += len(found)
+            if len(rows) < limit:
+                rows.extend(found)
+    return limit_rows(rows, limit, total, file_path, rows[limit - 1][5] if total > limit else 1)
+
+
+# === Построчный инкрементальный анализ ===
+class IncrementalDocument:
+    """Результаты анализа документа по строкам: каждая непустая строка - отдельное выражение.
+
+    Правки документа передаются в splice, затронутые строки помечаются как
+    изменённые (None), остальные сохраняют свои результаты и при вставке или
+    удалении строк только сдвигаются. refresh разбирает заново лишь
+    изменённые строки; одинаковые строки берутся из общего кэша.
+
+    Для фонового анализа refresh разбит на три шага: snapshot (в потоке
+    окна), analyze_lines (в любом потоке, документ не меняет) и apply
+    (снова в потоке окна; результат устаревшей версии отбрасывается).
+    """
+
+    def __init__(self, line_count=1, cache=None):
+        self.lines = [None] * line_count
+        self.cache = cache if cache is not None else AnalysisCache(4096)
+        self.version = 0
+
+    def splice(self, first_line, removed, inserted):
+        """Строки first_line..first_line+removed (с 1) заменены на inserted+1 новых строк."""
+        self.lines[first_line - 1:first_line + removed] = [None] * (inserted + 1)
+        self.version += 1
+
+    def reset(self, line_count):
+        self.lines = [None] * line_count
+        self.version += 1
+
+    def dirty_lines(self):
+        return [idx for idx, analysis in enumerate(self.lines, start=1) if analysis is None]
+
+    def snapshot(self, read_lines):
+        """Версия документа и тексты изменённых строк; read_lines(номера) возвращает их тексты."""
+        dirty = self.dirty_lines()
+        return self.version, dict(zip(dirty, read_lines(dirty)))
+
+    def analyze_lines(self, texts, file_path="Без имени", cancelled=None, executor=None):
+        """Анализ строк из snapshot; None, если cancelled() сообщил об отмене.
+
+        С executor большие наборы строк разбираются в пуле процессов.
+        """
+        statements = [(line, text) for line, text in texts.items() if text.strip()]
+        analyses = analyze_statements(statements, file_path, self.cache, executor, cancelled=cancelled)
+        if analyses is None:
+            return None
+        result = dict.fromkeys(texts, EMPTY_LINE)
+        result.update(analyses)
+        return result
+
+    def apply(self, version, analyses):
+        """Запись результатов analyze_lines; False, если документ успел измениться."""
+        if version != self.version:
+            return False
+        lines = self.lines
+        for line, analysis in analyses.items():
+            lines[line - 1] = analysis
+        return True
+
+    def refresh(self, read_lines, file_path="Без имени", executor=None):
+        """Повторный анализ изменённых строк в текущем потоке."""
+        version, texts = self.snapshot(read_lines)
+        self.apply(version, self.analyze_lines(texts, file_path, executor=executor))
+        return list(texts)
+
+    def diagnostics(self, file_path="Без имени"):
+        analyses = [(line, with_location(analysis, file_path, line))
+                    for line, analysis in enumerate(self.lines, start=1)
+                    if analysis is not None and (analysis["diagnostics"] or analysis["error"] is not None)]
+        return statement_rows(analyses, file_path)
+
+    def results(self):
+        """Пары (номер строки, результат) для строк, вычисленных без ошибок."""
+        return [(line, analysis["result"]) for line, analysis in enumerate(self.lines, start=1)
+                if analysis is not None and analysis["poliz"] and analysis["error"] is None]
+
+
+# Результат для пустой строки: в построчном режиме она не является выражением
+EMPTY_LINE = {"diagnostics": [], "poliz": None, "result": None, "error": None}
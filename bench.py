@@ -0,0 +1,206 @@
+"""Замеры скорости этапов анализа на выражениях от 10¹ до 10⁷ токенов.
+
+Пример запуска:
+    python bench.py --max-exp 6 --json bench_results.json > bench_output.txt
+
+Выражения строятся генераторами с фиксированным зерном, поэтому входные
+данные совпадают между запусками и коммитами. Для каждой формы выражения
+и каждого размера замеряются этапы по отдельности; результаты пишутся в
+JSON, чтобы регрессии можно было сравнить между коммитами. С --check
+проверяется, что время растёт линейно: наклон зависимости log(время) от
+log(размер) на размерах от --fit-from токенов не больше --max-slope.
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from analyzer import Parser, evaluate_poliz, to_poliz, tokenize
+from declarations import check_keywords_and_report_errors, clean_and_report_invalid_fragments
+
+DIGITS = "123456789"
+GARBAGE = "#$%&@!?~"
+
+
+# === Генераторы выражений ===
+def flat_chain(size, rng):
+    """d + d - d + ... - цепочка сложений и вычитаний."""
+    parts = [rng.choice(DIGITS)]
+    while len(parts) < size:
+        parts.append(rng.choice("+-"))
+        parts.append(rng.choice(DIGITS))
+    return " ".join(parts)
+
+
+def deep_nesting(size, rng):
+    """((...(d + d)...)) - вложенность глубиной около size / 4."""
+    depth = max(1, (size - 3) // 4)
+    inner = f"{rng.choice(DIGITS)} + {rng.choice(DIGITS)}"
+    operands = " ".join(f"{rng.choice('+-')} {rng.choice(DIGITS)})" for _ in range(depth))
+    return "(" * depth + inner + " " + operands
+
+
+def wide_product(size, rng):
+    """d * a / a * b / b ... - длинное произведение с ограниченным значением."""
+    parts = [rng.choice(DIGITS)]
+    while len(parts) < size:
+        digit = rng.choice(DIGITS)
+        parts.extend(("*", digit, "/", digit))
+    return " ".join(parts)
+
+
+def garbage_text(size, rng):
+    """Выражение, в котором половина токенов - невалидные фрагменты."""
+    parts = []
+    while len(parts) < size:
+        if rng.random() < 0.5:
+            parts.append("".join(rng.choice(GARBAGE) for _ in range(rng.randint(1, 3))))
+        else:
+            parts.append(rng.choice(DIGITS + "+-*/()"))
+    return " ".join(parts)
+
+
+SHAPES = {
+    "flat": flat_chain,
+    "nested": deep_nesting,
+    "product": wide_product,
+    "garbage": garbage_text,
+}
+
+
+# === Этапы ===
+def prepare(text):
+    """Входные данные всех этапов; их подготовка в замер не входит."""
+    _, cleaned = clean_and_report_invalid_fragments(f"const x : int = {text};")
+    tokens = [token for token in tokenize(text) if token.isdigit() or token in "+-*/()"]
+    parser = Parser(tokens)
+    parser.parse()
+    poliz = to_poliz(tokens) if not parser.errors else None
+    return {"text": text, "declaration": cleaned, "tokens": tokens, "poliz": poliz}
+
+
+def parse_tokens(tokens):
+    # Без лимита ошибок: на невалидных выражениях замеряется восстановление по всему входу
+    Parser(tokens, max_errors=len(tokens) + 1).parse()
+
+
+# Этап: (функция, имя входа); этапы ПОЛИЗ и вычисления - только для правильных выражений
+STAGES = {
+    "clean": (clean_and_report_invalid_fragments, "text"),
+    "keywords": (check_keywords_and_report_errors, "declaration"),
+    "tokenize": (tokenize, "text"),
+    "parse": (parse_tokens, "tokens"),
+    "to_poliz": (to_poliz, "tokens"),
+    "evaluate": (evaluate_poliz, "poliz"),
+}
+
+
+def measure(function, argument, repeat):
+    """Лучшее время из repeat запусков, в секундах."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmarks(shapes, stages, min_exp, max_exp, repeat, seed, log=None):
+    results = []
+    for shape in shapes:
+        for exp in range(min_exp, max_exp + 1):
+            size = 10 ** exp
+            text = SHAPES[shape](size, random.Random(f"{seed}-{shape}-{size}"))
+            inputs = prepare(text)
+            for stage in stages:
+                function, name = STAGES[stage]
+                if inputs[name] is None:
+                    continue
+                # Большие входы замеряются один раз: их время уже устойчиво
+                seconds = measure(function, inputs[name], repeat if exp < 6 else 1)
+                result = {"shape": shape, "stage": stage, "tokens": size, "seconds": seconds}
+                results.append(result)
+                if log is not None:
+                    print(f"{shape:8} {stage:9} {size:>9} {seconds * 1000:12.3f} мс", file=log, flush=True)
+    return results
+
+
+# === Проверка линейности ===
+def fit_slopes(results, fit_from):
+    """Наклон log(время)/log(размер) методом наименьших квадратов для каждой пары (форма, этап)."""
+    points = {}
+    for result in results:
+        if result["tokens"] >= fit_from and result["seconds"] > 0:
+            points.setdefault((result["shape"], result["stage"]), []).append(
+                (math.log(result["tokens"]), math.log(result["seconds"])))
+    slopes = {}
+    for (shape, stage), xy in points.items():
+        if len(xy) < 2:
+            continue
+        mean_x = sum(x for x, _ in xy) / len(xy)
+        mean_y = sum(y for _, y in xy) / len(xy)
+        slope = (sum((x - mean_x) * (y - mean_y) for x, y in xy)
+                 / sum((x - mean_x) ** 2 for x, _ in xy))
+        slopes[f"{shape}/{stage}"] = round(slope, 3)
+    return slopes
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Замеры скорости этапов анализа")
+    arg_parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=list(SHAPES),
+                            help="формы выражений")
+    arg_parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                            help="замеряемые этапы")
+    arg_parser.add_argument("--min-exp", type=int, default=1, help="наименьший размер - 10^min-exp токенов")
+    arg_parser.add_argument("--max-exp", type=int, default=6, help="наибольший размер - 10^max-exp токенов (до 7)")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="число повторов замера (берётся лучшее)")
+    arg_parser.add_argument("--seed", type=int, default=2024, help="зерно генераторов")
+    arg_parser.add_argument("--json", default="bench_results.json", help="файл для результатов в JSON")
+    arg_parser.add_argument("--check", action="store_true", help="проверить линейный рост времени")
+    arg_parser.add_argument("--fit-from", type=int, default=10 ** 4,
+                            help="наименьший размер, участвующий в проверке линейности")
+    arg_parser.add_argument("--max-slope", type=float, default=1.25, help="допустимый наклон (1 - линейный рост)")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    results = run_benchmarks(args.shapes, args.stages, args.min_exp, args.max_exp,
+                             args.repeat, args.seed, log=sys.stdout)
+    slopes = fit_slopes(results, args.fit_from)
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+        "slopes": slopes,
+    }
+    with open(args.json, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    failed = {name: slope for name, slope in slopes.items() if slope > args.max_slope}
+    for name, slope in sorted(slopes.items()):
+        mark = "  <-- рост быстрее линейного" if name in failed else ""
+        print(f"{name:20} наклон {slope:.3f}{mark}")
+    if args.check and failed:
+        print(f"Нелинейный рост времени: {', '.join(sorted(failed))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Замер холодного старта редакторов: время от запуска процесса до первой отрисовки окна.
+
+Пример запуска:
+    python bench_startup.py --runs 5
+    python bench_startup.py --exe dist/vin/vin.exe --exe-budget-ms 1500
+
+Редактор запускается с ключом --startup-time и закрывается сразу после
+первой отрисовки окна, так что время жизни процесса - это время холодного
+старта (иконки загружаются уже после него). Для каждой цели берётся
+медиана из --runs запусков; если она превышает бюджет, программа
+завершается с кодом 1. Нужен графический дисплей.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(command, runs):
+    """Время жизни процесса в миллисекундах для каждого из runs запусков."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command + ["--startup-time"], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Замер холодного старта редакторов")
+    arg_parser.add_argument("--runs", type=int, default=5, help="число запусков каждой цели")
+    arg_parser.add_argument("--budget-ms", type=float, default=800,
+                            help="бюджет медианы для запуска скриптом, мс")
+    arg_parser.add_argument("--exe", action="append", default=[],
+                            help="собранная программа (можно указать несколько раз)")
+    arg_parser.add_argument("--exe-budget-ms", type=float, default=1500,
+                            help="бюджет медианы для собранной программы, мс")
+    arg_parser.add_argument("--json", help="файл для результатов в JSON")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    targets = [(name, [sys.executable, os.path.join(HERE, name)], args.budget_ms)
+               for name in ("vin.py", "vin1.py")]
+    targets += [(exe, [exe], args.exe_budget_ms) for exe in args.exe]
+
+    results = []
+    failed = False
+    for name, command, budget in targets:
+        times = measure(command, args.runs)
+        median = statistics.median(times)
+        over = median > budget
+        failed = failed or over
+        results.append({"target": name, "times_ms": times, "median_ms": median, "budget_ms": budget})
+        mark = "  <-- превышен бюджет" if over else ""
+        print(f"{name:30} медиана {median:8.1f} мс (мин {min(times):.1f}, макс {max(times):.1f}), "
+              f"бюджет {budget:.0f} мс{mark}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"runs": args.runs, "results": results}, file, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Пакетная проверка файлов с выражениями без графического интерфейса.
+
+Пример запуска:
+    python check.py check expressions/ --format jsonl --jobs 8 > report.jsonl
+    python check.py stream huge.log --split line > results.jsonl
+
+С --split line (или statement) каждая строка (или оператор до ';') файла
+проверяется как отдельное выражение; операторы всех файлов делятся на
+пачки и распределяются по процессам, отчёт сохраняет их порядок. Файлы
+при этом читаются потоком, так что память не зависит от их размера.
+Команда stream так же вычисляет каждый оператор и выводит его результат.
+"""
+import argparse
+import csv
+import fnmatch
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import analyzer
+from analyzer import (COLUMNS, MAX_STATEMENT_LENGTH, STATEMENT_SPLITS, analyze, error_rows, init_process_cache,
+                      json_result, stream_statements)
+
+# Путь, означающий стандартный ввод (только при чтении по операторам)
+STDIN = "-"
+
+
+def iter_files(paths, pattern):
+    """Обход путей: каталоги - рекурсивно по маске, остальное отдаётся как есть.
+
+    Несуществующий путь тоже отдаётся, чтобы проверка сообщила об ошибке
+    чтения, а не пропустила его молча.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if fnmatch.fnmatch(name, pattern):
+                    yield os.path.join(dirpath, name)
+
+
+def iter_sources(paths, pattern):
+    """Как iter_files, но путь '-' (стандартный ввод) отдаётся как есть."""
+    for path in paths:
+        if path == STDIN:
+            yield path
+        else:
+            yield from iter_files([path], pattern)
+
+
+def read_file(file_path):
+    with open(file_path, "r", encoding="utf-8") as file:
+        return file.read().rstrip()
+
+
+def open_text(file_path):
+    if file_path == STDIN:
+        return open(sys.stdin.fileno(), "r", encoding="utf-8", closefd=False)
+    return open(file_path, "r", encoding="utf-8")
+
+
+def read_error_rows(file_path, error, line=1):
+    return [("E000", "Ошибка чтения", str(error), "1", file_path, f"{line}")]
+
+
+def check_file(file_path):
+    """Проверка одного файла; возвращает строки диагностики."""
+    try:
+        text = read_file(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        return read_error_rows(file_path, e)
+
+    analysis = analyze(text, file_path, cache=analyzer.process_cache)
+    return error_rows(analysis, file_path)
+
+
+def check_chunk(file_paths):
+    return [(file_path, check_file(file_path)) for file_path in file_paths]
+
+
+def iter_statements(file_paths, split):
+    """Операторы файлов по порядку: (файл, номер строки, текст, ошибка чтения).
+
+    Файлы читаются потоком, в памяти только текущий оператор. Файл без
+    операторов или с ошибкой чтения даёт запись без текста, чтобы попасть
+    в итог проверки; слишком длинный оператор - запись с ошибкой.
+    """
+    for file_path in file_paths:
+        line = 1
+        empty = True
+        try:
+            with open_text(file_path) as file:
+                for line, statement in stream_statements(file, split):
+                    empty = False
+                    if statement is None:
+                        yield file_path, line, None, f"оператор длиннее {MAX_STATEMENT_LENGTH} символов пропущен"
+                    else:
+                        yield file_path, line, statement, None
+        except (OSError, UnicodeDecodeError) as e:
+            yield file_path, line, None, str(e)
+            continue
+        if empty:
+            yield file_path, 1, None, None
+
+
+def check_statement(file_path, line, text, error):
+    if error is not None:
+        return read_error_rows(file_path, error, line)
+    if text is None:
+        return []
+    analysis = analyze(text, file_path, cache=analyzer.process_cache, line=line)
+    return error_rows(analysis, file_path, line)
+
+
+def check_statement_chunk(statements):
+    return [(statement[0], check_statement(*statement)) for statement in statements]
+
+
+def evaluate_statement(file_path, line, text, error):
+    """Результат оператора для команды stream: словарь для JSON или None для пустого файла."""
+    if text is None and error is None:
+        return None
+    result = None
+    evaluation_error = None
+    if error is not None:
+        rows = read_error_rows(file_path, error, line)
+    else:
+        analysis = analyze(text, file_path, cache=analyzer.process_cache, line=line)
+        rows = analysis["diagnostics"]
+        result, evaluation_error = json_result(analysis)
+    return {
+        "file_path": file_path,
+        "line": line,
+        "result": result,
+        "error": evaluation_error,
+        "diagnostics": [dict(zip(COLUMNS, row)) for row in rows],
+    }
+
+
+def evaluate_statement_chunk(statements):
+    return [evaluate_statement(*statement) for statement in statements]
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_checks(file_paths, jobs=None, chunk_size=None, cache_size=0, split=None):
+    """Проверка файлов в пуле процессов; отдаёт пары (файл, строки диагностики).
+
+    Одновременно в работе держится ограниченное число пачек, поэтому
+    список файлов не материализуется целиком, а порядок результатов
+    совпадает с порядком обхода. При split пачками идут операторы, и один
+    файл даёт подряд несколько пар - по одной на оператор.
+    """
+    if split:
+        chunks = iter_chunks(iter_statements(file_paths, split), chunk_size or 1024)
+        check = check_statement_chunk
+    else:
+        chunks = iter_chunks(file_paths, chunk_size or 64)
+        check = check_chunk
+    return map_chunks(check, chunks, jobs, cache_size)
+
+
+def map_chunks(check, chunks, jobs=None, cache_size=0):
+    """Результаты check для каждой пачки по порядку - в текущем процессе (jobs=1) или в пуле.
+
+    В пуле одновременно не больше jobs * 4 пачек, поэтому пачки читаются
+    из chunks по мере обработки.
+    """
+    if jobs == 1:
+        init_process_cache(cache_size)
+        for chunk in chunks:
+            yield from check(chunk)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_process_cache, initargs=(cache_size,)) as pool:
+        window = jobs * 4
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(check, chunk))
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n")
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+
+WRITERS = {"jsonl": JsonLinesWriter, "csv": CsvWriter}
+
+
+def cmd_check(args):
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = WRITERS[args.format](output)
+    files_total = 0
+    files_failed = 0
+    current_file = None
+    current_failed = False
+    try:
+        results = run_checks(iter_files(args.paths, args.pattern), args.jobs, args.chunk_size,
+                             args.cache_size, args.split)
+        for file_path, rows in results:
+            if file_path != current_file:
+                current_file = file_path
+                current_failed = False
+                files_total += 1
+            if rows and not current_failed:
+                current_failed = True
+                files_failed += 1
+            for row in rows:
+                writer.write(row)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Проверено файлов: {files_total}, с ошибками: {files_failed}", file=sys.stderr)
+    return 1 if files_failed else 0
+
+
+def cmd_stream(args):
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    statements_total = 0
+    statements_failed = 0
+    try:
+        chunks = iter_chunks(iter_statements(iter_sources(args.paths, args.pattern), args.split),
+                             args.chunk_size)
+        for record in map_chunks(evaluate_statement_chunk, chunks, args.jobs, args.cache_size):
+            if record is None:
+                continue
+            statements_total += 1
+            if record["diagnostics"] or record["error"] is not None:
+                statements_failed += 1
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Вычислено операторов: {statements_total}, с ошибками: {statements_failed}", file=sys.stderr)
+    return 1 if statements_failed else 0
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Анализатор выражений грамматики G[<E>]")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check", help="проверить файлы и каталоги")
+    check.add_argument("paths", nargs="+", help="файлы или каталоги для проверки")
+    check.add_argument("--format", choices=sorted(WRITERS), default="jsonl", help="формат вывода")
+    check.add_argument("--output", "-o", help="файл для отчёта (по умолчанию stdout)")
+    check.add_argument("--jobs", "-j", type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    check.add_argument("--pattern", default="*.txt", help="маска файлов в каталогах")
+    check.add_argument("--split", choices=STATEMENT_SPLITS, default=None,
+                       help="проверять каждую строку (line) или оператор до ';' (statement) отдельно")
+    check.add_argument("--chunk-size", type=int, default=None,
+                       help="файлов (с --split - операторов) в одной задаче пула; по умолчанию 64 (1024)")
+    check.add_argument("--cache-size", type=int, default=4096,
+                       help="размер LRU-кэша повторяющихся выражений на процесс (0 - без кэша)")
+    check.set_defaults(func=cmd_check)
+
+    stream = commands.add_parser("stream", help="вычислить операторы файлов потоком и вывести результаты")
+    stream.add_argument("paths", nargs="+", help="файлы или каталоги ('-' - стандартный ввод)")
+    stream.add_argument("--output", "-o", help="файл для результатов в JSONL (по умолчанию stdout)")
+    stream.add_argument("--jobs", "-j", type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    stream.add_argument("--pattern", default="*.txt", help="маска файлов в каталогах")
+    stream.add_argument("--split", choices=STATEMENT_SPLITS, default="line",
+                        help="оператор - строка (line) или фрагмент до ';' (statement)")
+    stream.add_argument("--chunk-size", type=int, default=1024, help="операторов в одной задаче пула")
+    stream.add_argument("--cache-size", type=int, default=4096,
+                        help="размер LRU-кэша повторяющихся выражений на процесс (0 - без кэша)")
+    stream.set_defaults(func=cmd_stream)
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
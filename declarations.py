@@ -0,0 +1,327 @@
+"""Проверка объявлений вида `const имя: int = выражение;` без графического интерфейса.
+
+Этапы: очистка текста от невалидных фрагментов, проверка ключевых слов и
+обязательных символов, вычисление выражения в правой части.
+"""
+import operator
+import re
+from functools import lru_cache
+
+
+# === Очистка текста и удаление невалидных символов ===
+def clean_and_report_invalid_fragments(text):
+    result = ''
+    invalid_fragments = []
+    buffer = ''
+    i = 0
+
+    def is_valid_char(c):
+        return c.isalnum() or c == '_' or c in 'аА' or c in "+-*/()"
+
+    while i < len(text):
+        c = text[i]
+
+        if c in '+-':
+            if i + 1 < len(text) and text[i + 1].isdigit():
+                buffer += c
+                i += 1
+                buffer += text[i]
+                i += 1
+                while i < len(text) and text[i].isdigit():
+                    buffer += text[i]
+                    i += 1
+                result += buffer
+                buffer = ''
+                continue
+            else:
+                buffer += c
+                i += 1
+                continue
+
+        if is_valid_char(c):
+            buffer += c
+        else:
+            if buffer:
+                result += buffer
+                buffer = ''
+
+            if c.isspace() or c in ":=;":
+                result += c
+            else:
+                invalid_segment = ''
+                while i < len(text) and not is_valid_char(text[i]) and not text[i].isspace() and text[i] not in ":=;":
+                    invalid_segment += text[i]
+                    i += 1
+                if invalid_segment:
+                    invalid_fragments.append(invalid_segment)
+                continue
+        i += 1
+
+    if buffer:
+        result += buffer
+
+    report = ""
+    for idx, fragment in enumerate(invalid_fragments, 1):
+        report += f"{idx} удалённый фрагмент - {fragment}\n"
+
+    return report, result
+
+
+# === Поиск ошибочно записанных ключевых слов ===
+KEYWORDS = ('const', 'val', 'int')
+
+
+class KeywordMatcher:
+    """Сопоставление идентификатора с ключевым словом, на которое он похож.
+
+    Идентификатор считается ошибочно записанным ключевым словом kw, если
+    содержит kw и хотя бы одну цифру, или если он не короче kw более чем
+    на один символ и отличается от kw не больше чем на max_distance правок.
+    Ключевые слова проверяются по порядку, выигрывает первое подходящее.
+    Расстояние считается с отсечением по max_distance, а результаты
+    запоминаются, поэтому повторяющиеся идентификаторы проверяются за O(1).
+    """
+
+    def __init__(self, keywords=KEYWORDS, max_distance=2, cache_size=65536):
+        self.keywords = tuple(keywords)
+        self.max_distance = max_distance
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def match(self, token):
+        """Ключевое слово, с которым спутан token, или None."""
+        try:
+            return self.cache[token]
+        except KeyError:
+            pass
+        has_digit = any(char.isdigit() for char in token)
+        result = None
+        for kw in self.keywords:
+            if has_digit and kw in token:
+                result = kw
+                break
+            if len(token) >= len(kw) - 1 and levenshtein_within(token, kw, self.max_distance):
+                result = kw
+                break
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[token] = result
+        return result
+
+
+default_matcher = KeywordMatcher()
+
+
+# === Проверка ключевых слов и структуры ===
+def check_keywords_and_report_errors(cleaned_text, matcher=None):
+    matcher = matcher or default_matcher
+    keywords = matcher.keywords
+    required_symbols = [':', '=', ';']
+    errors = []
+    found_keywords = set()
+    mistaken_keywords = set()
+
+    has_equal = '=' in cleaned_text
+    value_token = None
+    # Границы значения в тексте: токены внутри них заведомо входят в value_token
+    value_start = value_end = 0
+    if has_equal:
+        parts = cleaned_text.split('=', 2)
+        if len(parts) > 1:
+            expr_part = parts[1].split(';')[0]
+            value_token = expr_part.strip()
+            value_start = len(parts[0]) + 1 + len(expr_part) - len(expr_part.lstrip())
+            value_end = value_start + len(value_token)
+    else:
+        errors.append("нет токена (=)")
+
+    # Поиск подстроки в длинном значении - по одному разу на токен
+    in_value = {}
+    for match in re.finditer(r'\S+', cleaned_text):
+        token = match.group()
+        if token in keywords:
+            found_keywords.add(token)
+            continue
+
+        if token in [':', '=', ';']:
+            continue
+
+        if value_token:
+            if value_start <= match.start() and match.end() <= value_end:
+                continue
+            if token not in in_value:
+                in_value[token] = token in value_token
+            if in_value[token]:
+                continue
+
+        if token and token[0].isdigit():
+            errors.append(f"токен не может начинаться с числа ({token})")
+
+        kw = matcher.match(token)
+        if kw is not None:
+            errors.append(f"ожидалось ключевое слово ({kw}) – встретился идентификатор '{token}'")
+            mistaken_keywords.add(kw)
+
+    for kw in keywords:
+        if kw not in found_keywords and kw not in mistaken_keywords:
+            errors.append(f"нет токена ({kw})")
+
+    for symbol in required_symbols:
+        if symbol not in cleaned_text:
+            errors.append(f"нет токена ({symbol})")
+
+    return errors
+
+
+# === Расстояние Левенштейна с отсечением ===
+def levenshtein_within(s1, s2, limit):
+    """Не больше ли limit расстояние Левенштейна между s1 и s2.
+
+    Строки, длины которых различаются больше чем на limit, отсекаются
+    сразу; построчный расчёт прекращается, как только минимум строки
+    таблицы превысил limit.
+    """
+    if abs(len(s1) - len(s2)) > limit:
+        return False
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    prev_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        curr_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = prev_row[j + 1] + 1
+            deletions = curr_row[j] + 1
+            substitutions = prev_row[j] + (c1 != c2)
+            curr_row.append(min(insertions, deletions, substitutions))
+        if min(curr_row) > limit:
+            return False
+        prev_row = curr_row
+
+    return prev_row[-1] <= limit
+
+
+# === Компиляция арифметического выражения ===
+EXPRESSION_TOKEN_RE = re.compile(r"\s*(?:(\d+\.\d*|\.\d+|\d+)|(\*\*|//|[+\-*/()]))")
+
+BINARY_OPERATORS = {
+    '+': (1, operator.add),
+    '-': (1, operator.sub),
+    '*': (2, operator.mul),
+    '/': (2, operator.truediv),
+    '//': (2, operator.floordiv),
+}
+UNARY_PRECEDENCE = 3
+
+
+def tokenize_expression(expression):
+    """Разбиение выражения на числа и операторы."""
+    tokens = []
+    pos = 0
+    end = len(expression.rstrip())
+    while pos < end:
+        match = EXPRESSION_TOKEN_RE.match(expression, pos)
+        if not match:
+            raise ValueError(f"неожиданный символ '{expression[pos]}' в позиции {pos + 1}")
+        number, op = match.groups()
+        if op == '**':
+            raise ValueError("возведение в степень не поддерживается")
+        if number is not None:
+            if '.' in number:
+                tokens.append(float(number))
+            elif number[0] == '0' and number.strip('0'):
+                raise ValueError(f"число с ведущим нулём '{number}'")
+            else:
+                tokens.append(int(number))
+        else:
+            tokens.append(op)
+        pos = match.end()
+    return tokens
+
+
+def compile_arithmetic(expression):
+    """Компиляция выражения в ПОЛИЗ-кортеж из чисел и функций.
+
+    Унарные плюс и минус записываются как ('neg',) и опускаются для плюса;
+    бинарные операции - как функции модуля operator.
+    """
+    tokens = tokenize_expression(expression)
+    code = []
+    pos = 0
+
+    def parse(min_precedence):
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError("неожиданный конец выражения")
+        token = tokens[pos]
+        pos += 1
+        if token in ('+', '-'):
+            parse(UNARY_PRECEDENCE)
+            if token == '-':
+                code.append(operator.neg)
+        elif token == '(':
+            parse(1)
+            if pos >= len(tokens) or tokens[pos] != ')':
+                raise ValueError("ожидалась закрывающая скобка")
+            pos += 1
+        elif isinstance(token, str):
+            raise ValueError(f"неожиданный символ '{token}'")
+        else:
+            code.append(token)
+
+        while pos < len(tokens):
+            token = tokens[pos]
+            if token not in BINARY_OPERATORS or BINARY_OPERATORS[token][0] < min_precedence:
+                return
+            precedence, function = BINARY_OPERATORS[token]
+            pos += 1
+            parse(precedence + 1)
+            code.append(function)
+
+    parse(1)
+    if pos < len(tokens):
+        raise ValueError(f"лишний символ '{tokens[pos]}'")
+    return tuple(code)
+
+
+@lru_cache(maxsize=4096)
+def compiled_expression(expression):
+    """Скомпилированное выражение или текст ошибки компиляции.
+
+    Результат кэшируется по тексту выражения, поэтому повторный анализ
+    того же объявления не разбирает и не компилирует его заново.
+    """
+    if not re.fullmatch(r'[\d+\-*/().\s]+', expression):
+        return None, "Выражение содержит недопустимые символы."
+    try:
+        return compile_arithmetic(expression), None
+    except ValueError as e:
+        return None, f"Ошибка вычисления: {str(e)}"
+    except RecursionError:
+        return None, "Ошибка вычисления: слишком глубокая вложенность скобок"
+
+
+def run_arithmetic(code):
+    stack = []
+    for item in code:
+        if item is operator.neg:
+            stack[-1] = -stack[-1]
+        elif callable(item):
+            b = stack.pop()
+            stack[-1] = item(stack[-1], b)
+        else:
+            stack.append(item)
+    return stack[0]
+
+
+# === Безопасное вычисление выражения ===
+def parse_and_evaluate_expression(expression):
+    code, error = compiled_expression(expression)
+    if error:
+        return error
+    try:
+        return run_arithmetic(code)
+    except ZeroDivisionError:
+        return "Ошибка: деление на ноль."
+    except Exception as e:
+        return f"Ошибка вычисления: {str(e)}"
@@ -0,0 +1,538 @@
+"""Общие элементы текстового редактора для vin.py и vin1.py."""
+import codecs
+import hashlib
+import io
+import mmap
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import filedialog, messagebox
+from tkinter import font as tkfont
+from tkinter import ttk
+
+
+# === Номера строк ===
+class LineNumbers(tk.Canvas):
+    """Колонка номеров строк, в которой рисуются только видимые строки.
+
+    Перерисовка стоит O(видимых строк) и выполняется не чаще одного раза
+    за цикл обработки событий: после прокрутки, изменения размера окна и
+    правок текста.
+    """
+
+    def __init__(self, master, text_area, **kwargs):
+        kwargs.setdefault("background", "lightgray")
+        super().__init__(master, width=30, highlightthickness=0, borderwidth=0, takefocus=0, **kwargs)
+        self.text_area = text_area
+        self.scroll_command = None
+        self.after_id = None
+        self.font_spec = None
+        self.text_font = None
+        text_area.config(yscrollcommand=self.on_scroll)
+        text_area.bind("<Configure>", lambda event: self.schedule_redraw(), add="+")
+
+    def on_scroll(self, first, last):
+        """yscrollcommand текстового поля: перерисовка и передача полосе прокрутки."""
+        if self.scroll_command is not None:
+            self.scroll_command(first, last)
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        if self.after_id is None:
+            self.after_id = self.after_idle(self.redraw)
+
+    def redraw(self):
+        self.after_id = None
+        self.delete("all")
+        text_area = self.text_area
+        font_spec = text_area.cget("font")
+        if font_spec != self.font_spec:
+            self.font_spec = font_spec
+            self.text_font = tkfont.Font(font=font_spec)
+        text_font = self.text_font
+        right = int(self.cget("width")) - 3
+
+        last_line = int(text_area.index("end-1c").split(".")[0])
+        index = text_area.index("@0,0")
+        line = None
+        while int(index.split(".")[0]) <= last_line:
+            info = text_area.dlineinfo(index)
+            if info is None:
+                break
+            line = index.split(".")[0]
+            self.create_text(right, info[1], anchor="ne", text=line, font=text_font)
+            index = text_area.index(f"{line}.0+1line")
+            if index.split(".")[0] == line:
+                break
+
+        # Ширина колонки - по числу цифр последней видимой строки
+        width = text_font.measure("0" * max(len(line or "1"), 2)) + 8
+        if width != int(self.cget("width")):
+            self.config(width=width)
+            self.schedule_redraw()
+
+
+# === Отслеживание несохранённых изменений ===
+def content_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def is_modified(text_area, saved_hash):
+    """Есть ли в поле несохранённые изменения.
+
+    Пока флаг modified текстового поля сброшен, ответ стоит O(1). Если флаг
+    установлен, текст сверяется с хэшем, записанным при загрузке или
+    сохранении, - так правки, отменённые до сохранённого состояния, не
+    считаются изменениями. Файл на диске не читается.
+    """
+    if not text_area.edit_modified():
+        return False
+    if saved_hash is not None and content_hash(text_area.get("1.0", "end-1c")) == saved_hash:
+        text_area.edit_modified(False)
+        return False
+    return True
+
+
+# === Постепенная загрузка файлов ===
+def iter_file_chunks(file_path, chunk_size=256 * 1024):
+    """Текст файла порциями: пары (прочитано байт, текст порции).
+
+    Файл по возможности отображается в память (mmap), поэтому целиком в
+    памяти процесса не хранится. Переводы строк приводятся к '\n', как при
+    чтении в текстовом режиме.
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+    with open(file_path, "rb") as file:
+        try:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            source = None  # пустой или особый файл - обычное чтение
+
+        done = 0
+        try:
+            while True:
+                data = source[done:done + chunk_size] if source is not None else file.read(chunk_size)
+                if not data:
+                    break
+                done += len(data)
+                yield done, decoder.decode(data)
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield done, tail
+        finally:
+            if source is not None:
+                source.close()
+
+
+class FileLoader:
+    """Загрузка файла в текстовое поле порциями без блокировки окна.
+
+    Каждая порция вставляется отдельным вызовом через after, между ними
+    обрабатываются события окна. На время загрузки поле недоступно для
+    ввода и не ведёт историю отмены. on_progress(прочитано, всего)
+    вызывается после каждой порции, on_done(cancelled, error) - по
+    завершении (error - исключение при ошибке чтения). После загрузки в
+    content_hash - хэш загруженного текста для is_modified.
+    """
+
+    def __init__(self, text_area, file_path, on_progress=None, on_done=None, chunk_size=256 * 1024):
+        self.text_area = text_area
+        self.file_path = file_path
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.total = os.path.getsize(file_path)
+        self.chunks = iter_file_chunks(file_path, chunk_size)
+        self.after_id = None
+        self.finished = False
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.content_hash = None
+
+    def start(self):
+        self.text_area.config(undo=False, state=tk.DISABLED)
+        self.after_id = self.text_area.after_idle(self.step)
+
+    def step(self):
+        self.after_id = None
+        try:
+            done, text = next(self.chunks)
+        except StopIteration:
+            self.finish(cancelled=False)
+            return
+        except (OSError, UnicodeDecodeError) as e:
+            self.finish(cancelled=True, error=e)
+            return
+
+        self.digest.update(text.encode("utf-8"))
+        self.text_area.config(state=tk.NORMAL)
+        self.text_area.insert("end-1c", text)
+        self.text_area.config(state=tk.DISABLED)
+        if self.on_progress is not None:
+            self.on_progress(done, self.total)
+        self.after_id = self.text_area.after(1, self.step)
+
+    def cancel(self):
+        if not self.finished:
+            if self.after_id is not None:
+                self.text_area.after_cancel(self.after_id)
+                self.after_id = None
+            self.finish(cancelled=True)
+
+    def finish(self, cancelled, error=None):
+        self.finished = True
+        self.content_hash = self.digest.hexdigest()
+        self.chunks.close()
+        self.text_area.config(undo=True, state=tk.NORMAL)
+        self.text_area.edit_reset()
+        self.text_area.edit_modified(False)
+        if self.on_done is not None:
+            self.on_done(cancelled, error)
+
+
+def finish_loading(notebook, status_var, tab, cancelled, error=None):
+    """Завершение постепенной загрузки файла; при отмене или ошибке вкладка закрывается."""
+    tab.saved_hash = tab.loader.content_hash
+    tab.loader = None
+    if error is not None:
+        status_var.set("")
+        messagebox.showerror("Ошибка", f"Не удалось открыть файл: {error}")
+    elif cancelled:
+        status_var.set("Загрузка отменена")
+    else:
+        status_var.set("")
+    if cancelled:
+        notebook.forget(tab)
+        tab.destroy()
+
+
+def cancel_loading(notebook):
+    """Отмена загрузки файла в активной вкладке."""
+    current_tab = notebook.nametowidget(notebook.select()) if notebook.select() else None
+    if current_tab is not None and getattr(current_tab, "loader", None) is not None:
+        current_tab.loader.cancel()
+
+
+# === Фоновое атомарное сохранение ===
+# umask процесса: узнать его, не изменив, нельзя, поэтому он читается один
+# раз при импорте, пока фоновых потоков ещё нет
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def write_atomic(file_path, text):
+    """Запись через временный файл в том же каталоге, fsync и атомарное переименование.
+
+    При сбое во время записи прежнее содержимое файла остаётся нетронутым.
+    Права существующего файла сохраняются, новый получает права по umask,
+    как при обычном open. Символическая ссылка не заменяется: запись идёт в
+    файл, на который она указывает.
+    """
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(prefix=".~" + os.path.basename(file_path), suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        else:
+            os.chmod(temp_path, 0o666 & ~UMASK)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # Фиксация переименования в каталоге (на Windows недоступна)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+class BackgroundSaver:
+    """Очередь сохранений, которые выполняет отдельный поток.
+
+    save ставит снимок текста в очередь и сразу возвращает управление.
+    Если файл ещё ждёт записи, более ранний снимок заменяется новым.
+    on_saved(error) вызывается в потоке окна (через after) с None или
+    исключением. Перед выходом из программы нужно вызвать wait.
+    """
+
+    def __init__(self, widget, poll_interval=50):
+        self.widget = widget
+        self.poll_interval = poll_interval
+        self.pending = OrderedDict()  # путь → (текст, on_saved)
+        self.in_progress = 0
+        self.condition = threading.Condition()
+        self.done = queue.Queue()
+        self.thread = None
+        self.after_id = None
+
+    def save(self, file_path, text, on_saved=None):
+        with self.condition:
+            self.pending.pop(file_path, None)
+            self.pending[file_path] = (text, on_saved)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        if self.after_id is None:
+            self.after_id = self.widget.after(self.poll_interval, self.poll)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                file_path, (text, on_saved) = self.pending.popitem(last=False)
+                self.in_progress += 1
+            error = None
+            try:
+                write_atomic(file_path, text)
+            except Exception as e:
+                error = e
+            self.done.put((on_saved, error))
+            with self.condition:
+                self.in_progress -= 1
+                self.condition.notify_all()
+
+    def busy(self):
+        with self.condition:
+            return bool(self.pending) or self.in_progress > 0
+
+    def wait(self):
+        """Ожидание записи всех поставленных в очередь снимков и вызов их обработчиков."""
+        with self.condition:
+            while self.pending or self.in_progress:
+                self.condition.wait()
+        self.deliver()
+
+    def deliver(self):
+        while True:
+            try:
+                on_saved, error = self.done.get_nowait()
+            except queue.Empty:
+                return
+            if on_saved is not None:
+                on_saved(error)
+
+    def poll(self):
+        self.after_id = None
+        self.deliver()
+        if self.busy():
+            self.after_id = self.widget.after(self.poll_interval, self.poll)
+        else:
+            self.deliver()
+
+
+def start_save(saver, status_var, tab, file_path, notebook=None):
+    """Сохранение снимка текста вкладки в фоновом потоке saver (BackgroundSaver).
+
+    Пока файл загружается, в поле только его начало, поэтому сохранение
+    отклоняется: иначе файл на диске заменился бы обрезанным текстом.
+    При «Сохранить как» передаётся notebook: путь и заголовок вкладки
+    меняются только после успешной записи.
+    """
+    if getattr(tab, "loader", None) is not None:
+        status_var.set("Файл ещё загружается: сохранение недоступно (Esc - отмена загрузки)")
+        return
+    text = tab.text_area.get("1.0", tk.END)
+    tab.text_area.edit_modified(False)
+    name = file_path.split("/")[-1]
+    status_var.set(f"Сохранение {name}...")
+    saver.save(file_path, text,
+               lambda error: finish_save(status_var, tab, name, text, error, file_path, notebook))
+
+
+def finish_save(status_var, tab, name, text, error, file_path=None, notebook=None):
+    """Завершение фонового сохранения (text - снимок вместе с завершающим переводом строки)."""
+    if error is None:
+        if notebook is not None and tab.winfo_exists():
+            notebook.tab(tab, text=name)
+            tab.file_path = file_path
+        tab.saved_hash = content_hash(text[:-1])
+        status_var.set(f"Сохранено: {name}")
+    else:
+        if tab.winfo_exists():
+            tab.text_area.edit_modified(True)
+        status_var.set(f"Ошибка сохранения: {name}")
+        messagebox.showerror("Ошибка", f"Не удалось сохранить файл {name}: {error}")
+
+
+# === Замеры этапов анализа ===
+class StageTimings:
+    """Замеры этапов анализа в редакторе.
+
+    Профилировщик создаётся, только если включён флаг enabled_var; итоги
+    последнего запуска выводятся в status_var и выгружаются командой export.
+    """
+
+    def __init__(self, enabled_var, status_var):
+        self.enabled_var = enabled_var
+        self.status_var = status_var
+        self.last = None
+
+    def new_profiler(self):
+        """Профилировщик для запуска анализа или None, если замеры выключены."""
+        if not self.enabled_var.get():
+            return None
+        from profiling import StageProfiler
+        return StageProfiler(memory=True)
+
+    def show(self, profiler):
+        """Итоги замеров - в строку состояния."""
+        if profiler is None:
+            return
+        profiler.close()
+        self.last = profiler
+        self.status_var.set(profiler.summary())
+
+    def export(self):
+        """Выгрузка замеров последнего запуска в JSON или Chrome trace."""
+        if self.last is None:
+            messagebox.showinfo("Замеры", "Нет замеров: включите «Замеры этапов» и запустите анализ.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".trace.json",
+                                                 filetypes=[("Chrome trace", "*.trace.json"), ("JSON", "*.json")])
+        if file_path:
+            try:
+                self.last.write(file_path)
+            except OSError as e:
+                messagebox.showerror("Ошибка", f"Не удалось сохранить замеры: {e}")
+
+
+# === Замер холодного старта ===
+def close_after_first_paint(root):
+    """Закрытие окна сразу после его первой отрисовки (для bench_startup.py).
+
+    wait_visibility ждёт, пока окно действительно появится на экране, а
+    update обрабатывает события Expose и отложенную перерисовку виджетов.
+    """
+    root.wait_visibility()
+    root.update()
+    root.destroy()
+
+
+# === Таблица диагностики ===
+class DiagnosticsTable:
+    """Виртуальная таблица диагностики поверх ttk.Treeview.
+
+    Все строки хранятся в списке, а в Treeview вставляются только видимые
+    (не больше max_rendered), поэтому очистка и вывод сотен тысяч строк
+    стоят O(видимых строк). Полоса прокрутки управляет смещением в списке.
+    Щелчок по заголовку сортирует строки по столбцу, set_filter оставляет
+    строки с одним кодом.
+    """
+
+    def __init__(self, tree, scrollbar, info_var=None, max_rendered=200):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.info_var = info_var
+        self.max_rendered = max_rendered
+        self.columns = tuple(tree.cget("columns"))
+        self.rows = []
+        self.view = []
+        self.offset = 0
+        self.code = None
+        self.sort_column = None
+        self.sort_reverse = False
+        self.after_id = None
+
+        scrollbar.config(command=self.on_scrollbar)
+        tree.configure(yscrollcommand="")
+        for column in self.columns:
+            tree.heading(column, command=lambda column=column: self.sort_by(column))
+        tree.bind("<Configure>", lambda event: self.schedule_render(), add="+")
+        tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        tree.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+
+    def set_rows(self, rows):
+        self.rows = list(rows)
+        self.offset = 0
+        self.update_view()
+
+    def clear(self):
+        self.set_rows([])
+
+    def set_filter(self, code=None):
+        """Показывать только строки с кодом code (None - все строки)."""
+        self.code = code or None
+        self.offset = 0
+        self.update_view()
+
+    def sort_by(self, column):
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        self.update_view()
+
+    def update_view(self):
+        view = self.rows
+        if self.code is not None:
+            view = [row for row in view if row[0] == self.code]
+        if self.sort_column is not None:
+            index = self.columns.index(self.sort_column)
+            view = sorted(view, key=lambda row: sort_key(row[index]), reverse=self.sort_reverse)
+        self.view = view
+        self.schedule_render()
+
+    def page_size(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        fits = (self.tree.winfo_height() - row_height) // row_height
+        return max(1, min(max(fits, int(self.tree.cget("height"))), self.max_rendered))
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.offset = int(float(args[0]) * len(self.view))
+            self.schedule_render()
+        elif action == "scroll":
+            self.scroll(int(args[0]), args[1])
+
+    def scroll(self, amount, what):
+        self.offset += amount * (self.page_size() if what == "pages" else 1)
+        self.schedule_render()
+        return "break"
+
+    def schedule_render(self):
+        if self.after_id is None:
+            self.after_id = self.tree.after_idle(self.render)
+
+    def render(self):
+        self.after_id = None
+        page = self.page_size()
+        total = len(self.view)
+        self.offset = max(0, min(self.offset, total - page))
+
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        for values in self.view[self.offset:self.offset + page]:
+            tree.insert("", "end", values=values)
+
+        if total:
+            self.scrollbar.set(self.offset / total, min(self.offset + page, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        if self.info_var is not None:
+            shown = min(page, total - self.offset)
+            self.info_var.set(f"Строки {self.offset + 1}–{self.offset + shown} из {total}" if total else "Нет записей")
+
+
+def sort_key(value):
+    """Ключ сортировки ячейки: числа - по значению, остальное - как текст."""
+    value = str(value)
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
@@ -0,0 +1,274 @@
+"""Сервер Language Server Protocol для файлов с выражениями (stdio).
+
+Запуск из редактора: команда `python lsp.py`, обмен через stdin/stdout.
+
+Каждая непустая строка документа - отдельное выражение, как в построчном
+режиме vin1.py. Правки принимаются инкрементально (textDocumentSync = 2):
+изменения из didChange накладываются на список строк и помечают в
+IncrementalDocument только затронутые строки, поэтому повторно
+разбираются лишь они. Диагностика (E001 - невалидный фрагмент, E002 -
+синтаксическая ошибка, E003 - ошибка вычисления) публикуется с диапазонами
+в строке; если правки приходят подряд, публикация откладывается до
+разбора последней из них, но не больше чем на MAX_PUBLISH_DELAY, и
+всегда выполняется перед ответом на shutdown.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from analyzer import IncrementalDocument, Parser, lex
+
+SYNC_INCREMENTAL = 2
+SEVERITY_ERROR = 1
+# Диагностика целиком пересылается при каждой публикации, поэтому её объём ограничен
+MAX_PUBLISHED = 1000
+# Наибольшая задержка публикации, пока правки идут без перерыва, секунд
+MAX_PUBLISH_DELAY = 0.2
+
+
+# === Позиции LSP (UTF-16) ===
+def to_index(text, units):
+    """Индекс символа строки по смещению в единицах UTF-16."""
+    if text.isascii():
+        return min(units, len(text))
+    count = 0
+    for index, char in enumerate(text):
+        if count >= units:
+            return index
+        count += 2 if ord(char) > 0xFFFF else 1
+    return len(text)
+
+
+def to_units(text, index):
+    """Смещение в единицах UTF-16 по индексу символа строки."""
+    if text.isascii():
+        return index
+    return index + sum(1 for char in text[:index] if ord(char) > 0xFFFF)
+
+
+# === Диагностика строки ===
+@lru_cache(maxsize=4096)
+def line_diagnostics(text, error=None):
+    """Ошибки одной строки: кортежи (начало, конец, код, сообщение) со столбцами строки.
+
+    Строка разбирается заново только здесь и только для строк с ошибками;
+    error - ошибка вычисления из результата анализа строки.
+    """
+    tokens = []
+    found = []
+    for token in lex(text):
+        if token.kind == 'invalid':
+            end = token.offset + len(token.value)
+            found.append((token.offset, end, "E001", f"невалидный фрагмент '{token.value}'"))
+        else:
+            tokens.append(token)
+
+    parser = Parser([token.value for token in tokens])
+    parser.parse()
+    line_end = len(text.rstrip())
+    for message, pos in zip(parser.errors, parser.positions):
+        if pos < len(tokens):
+            start = tokens[pos].offset
+            found.append((start, start + len(tokens[pos].value), "E002", message))
+        else:
+            found.append((line_end, line_end, "E002", message))
+
+    if error is not None and not found:
+        found.append((len(text) - len(text.lstrip()), line_end, "E003", f"Ошибка вычисления: {error}"))
+    return tuple(found)
+
+
+# === Документ ===
+class Document:
+    """Строки документа и построчные результаты анализа."""
+
+    def __init__(self, uri, text):
+        self.uri = uri
+        self.lines = text.split("\n")
+        self.analysis = IncrementalDocument(len(self.lines))
+
+    def apply_change(self, change):
+        if "range" not in change:
+            self.lines = change["text"].split("\n")
+            self.analysis.reset(len(self.lines))
+            return
+
+        lines = self.lines
+        start = change["range"]["start"]
+        end = change["range"]["end"]
+        first = min(start["line"], len(lines) - 1)
+        last = min(end["line"], len(lines) - 1)
+        prefix = lines[first][:to_index(lines[first], start["character"])]
+        suffix = lines[last][to_index(lines[last], end["character"]):]
+        inserted = (prefix + change["text"] + suffix).split("\n")
+        lines[first:last + 1] = inserted
+        self.analysis.splice(first + 1, last - first, len(inserted) - 1)
+
+    def diagnostics(self):
+        """Диагностика LSP по строкам с ошибками (не больше MAX_PUBLISHED)."""
+        lines = self.lines
+        self.analysis.refresh(lambda numbers: [lines[number - 1] for number in numbers], self.uri)
+        result = []
+        for number, analysis in enumerate(self.analysis.lines):
+            if analysis is None or (not analysis["diagnostics"] and analysis["error"] is None):
+                continue
+            text = lines[number]
+            for start, end, code, message in line_diagnostics(text, analysis["error"]):
+                result.append({
+                    "range": {
+                        "start": {"line": number, "character": to_units(text, start)},
+                        "end": {"line": number, "character": to_units(text, end)},
+                    },
+                    "severity": SEVERITY_ERROR,
+                    "code": code,
+                    "source": "G[<E>]",
+                    "message": message,
+                })
+            if len(result) >= MAX_PUBLISHED:
+                break
+        return result[:MAX_PUBLISHED]
+
+
+# === JSON-RPC поверх stdio ===
+def read_message(stream):
+    """Сообщение JSON-RPC с заголовком Content-Length или None в конце потока."""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.decode("ascii").partition(":")
+        if name.lower() == "content-length":
+            length = int(value.strip())
+    if length is None:
+        return None
+    message = json.loads(stream.read(length).decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("сообщение JSON-RPC должно быть объектом")
+    return message
+
+
+def write_message(stream, message):
+    body = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+    stream.flush()
+
+
+class LanguageServer:
+    def __init__(self, output):
+        self.output = output
+        self.documents = {}
+        self.dirty = set()
+        self.shutdown_requested = False
+
+    def send(self, message):
+        write_message(self.output, dict(message, jsonrpc="2.0"))
+
+    def publish(self, uri):
+        document = self.documents.get(uri)
+        diagnostics = document.diagnostics() if document is not None else []
+        self.send({"method": "textDocument/publishDiagnostics",
+                   "params": {"uri": uri, "diagnostics": diagnostics}})
+
+    def flush(self):
+        """Публикация диагностики всех документов, изменённых с прошлого раза."""
+        for uri in sorted(self.dirty):
+            self.publish(uri)
+        self.dirty.clear()
+
+    def handle(self, message):
+        """Обработка сообщения; False - пора завершаться."""
+        method = message.get("method")
+        params = message.get("params") or {}
+        if "id" in message and method is not None:
+            self.respond(message["id"], method)
+            return True
+
+        if method == "textDocument/didOpen":
+            document = params["textDocument"]
+            self.documents[document["uri"]] = Document(document["uri"], document["text"])
+            self.dirty.add(document["uri"])
+        elif method == "textDocument/didChange":
+            uri = params["textDocument"]["uri"]
+            document = self.documents.get(uri)
+            if document is not None:
+                for change in params["contentChanges"]:
+                    document.apply_change(change)
+                self.dirty.add(uri)
+        elif method == "textDocument/didClose":
+            uri = params["textDocument"]["uri"]
+            self.documents.pop(uri, None)
+            self.dirty.discard(uri)
+            self.publish(uri)
+        elif method == "exit":
+            return False
+        return True
+
+    def respond(self, request_id, method):
+        if method == "initialize":
+            result = {
+                "capabilities": {"textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL}},
+                "serverInfo": {"name": "laba-5-expressions"},
+            }
+        elif method == "shutdown":
+            # Диагностика правок, пришедших вместе с shutdown, публикуется до ответа
+            self.flush()
+            self.shutdown_requested = True
+            result = None
+        else:
+            self.send({"id": request_id, "error": {"code": -32601, "message": f"метод не поддерживается: {method}"}})
+            return
+        self.send({"id": request_id, "result": result})
+
+
+def read_messages(stream, messages):
+    """Чтение stdin в отдельном потоке: основной поток видит, есть ли ещё правки в очереди.
+
+    После конца потока или неразборчивого сообщения в очередь ставится
+    None, и основной поток завершается.
+    """
+    try:
+        while True:
+            message = read_message(stream)
+            if message is None:
+                return
+            messages.put(message)
+    except (OSError, ValueError) as e:
+        print(f"lsp: не удалось прочитать сообщение: {e}", file=sys.stderr)
+    finally:
+        messages.put(None)
+
+
+def main():
+    server = LanguageServer(sys.stdout.buffer)
+    messages = queue.Queue()
+    threading.Thread(target=read_messages, args=(sys.stdin.buffer, messages), daemon=True).start()
+    deadline = None
+    while True:
+        message = messages.get()
+        if message is None or not server.handle(message):
+            break
+        # Пока правки идут подряд, диагностика откладывается, но не дольше MAX_PUBLISH_DELAY
+        if not server.dirty:
+            deadline = None
+            continue
+        if deadline is None:
+            deadline = time.monotonic() + MAX_PUBLISH_DELAY
+        if messages.empty() or time.monotonic() >= deadline:
+            server.flush()
+            deadline = None
+    return 0 if server.shutdown_requested else 1
+
+
+if __name__ == "__main__":
+    code = main()
+    sys.stdout.flush()
+    # Поток чтения может быть заблокирован в stdin; обычное завершение ждало бы его
+    os._exit(code)
@@ -0,0 +1,127 @@
+"""Замеры этапов анализа: время, число токенов и пик выделенной памяти.
+
+Профилировщик передаётся в функции анализа необязательным аргументом;
+без него этапы не замеряются и накладные расходы сводятся к проверке
+на None. Результаты выводятся строкой для строки состояния и
+выгружаются в JSON или в формате Chrome trace (chrome://tracing, Perfetto).
+"""
+import json
+import os
+import time
+import tracemalloc
+from collections import namedtuple
+
+# start и seconds - в секундах от начала замеров; peak - байты или None
+Stage = namedtuple("Stage", "name start seconds count peak")
+
+STAGE_NAMES = {
+    "clean": "очистка",
+    "lex": "лексика",
+    "keywords": "ключевые слова",
+    "cache": "кэш",
+    "parse": "разбор",
+    "poliz": "ПОЛИЗ",
+    "evaluate": "вычисление",
+    "statements": "операторы",
+}
+
+
+class StageProfiler:
+    """Последовательность замеров этапов: start(имя) ... stop(число токенов).
+
+    С memory=True на время замеров включается tracemalloc, и для каждого
+    этапа записывается пик выделенной памяти; это заметно замедляет
+    анализ, поэтому по умолчанию замеряется только время.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = []
+        self.origin = time.perf_counter()
+        self.current = None
+        self.started_tracing = False
+
+    def start(self, name):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+        self.current = (name, time.perf_counter())
+
+    def stop(self, count=None):
+        end = time.perf_counter()
+        name, begin = self.current
+        self.current = None
+        peak = tracemalloc.get_traced_memory()[1] if self.memory else None
+        self.stages.append(Stage(name, begin - self.origin, end - begin, count, peak))
+
+    def close(self):
+        """Выключение tracemalloc, если его включил этот профилировщик."""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def totals(self):
+        """Суммы по этапам в порядке их первого появления: имя -> (секунды, токены, пик)."""
+        totals = {}
+        for stage in self.stages:
+            seconds, count, peak = totals.get(stage.name, (0.0, None, None))
+            if stage.count is not None:
+                count = (count or 0) + stage.count
+            if stage.peak is not None:
+                peak = max(peak or 0, stage.peak)
+            totals[stage.name] = (seconds + stage.seconds, count, peak)
+        return totals
+
+    def summary(self):
+        """Строка для строки состояния: этап время (токены), ..., пик памяти."""
+        parts = []
+        peak_total = None
+        for name, (seconds, count, peak) in self.totals().items():
+            part = f"{STAGE_NAMES.get(name, name)} {seconds * 1000:.1f} мс"
+            if count is not None:
+                part += f" ({count} ток.)"
+            parts.append(part)
+            if peak is not None:
+                peak_total = max(peak_total or 0, peak)
+        if peak_total is not None:
+            parts.append(f"пик памяти {peak_total / 1024:.0f} КБ")
+        return " | ".join(parts)
+
+    def to_dict(self):
+        return {"stages": [stage._asdict() for stage in self.stages]}
+
+    def write_json(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def write_chrome_trace(self, file_path):
+        """Выгрузка в формате Trace Event: по событию 'X' (длительность) на этап."""
+        pid = os.getpid()
+        events = []
+        for stage in self.stages:
+            args = {}
+            if stage.count is not None:
+                args["tokens"] = stage.count
+            if stage.peak is not None:
+                args["peak_bytes"] = stage.peak
+            events.append({
+                "name": STAGE_NAMES.get(stage.name, stage.name),
+                "cat": stage.name,
+                "ph": "X",
+                "ts": stage.start * 1e6,
+                "dur": stage.seconds * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": args,
+            })
+        with open(file_path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file, ensure_ascii=False)
+
+    def write(self, file_path):
+        """Выгрузка по имени файла: *.trace.json - Chrome trace, иначе JSON."""
+        if file_path.endswith(".trace.json"):
+            self.write_chrome_trace(file_path)
+        else:
+            self.write_json(file_path)
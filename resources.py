@@ -0,0 +1,78 @@
+"""Ресурсы редакторов: иконки панели инструментов и окна.
+
+Иконки лежат в каталоге icons рядом с программой, а в сборке PyInstaller
+упакованы внутрь неё (см. vin.spec). Они загружаются после появления окна,
+по одной за проход цикла событий; пока иконка не загружена или если её
+файла нет, на кнопке остаётся текст.
+"""
+import os
+import sys
+import tkinter as tk
+
+ICON_FILES = {
+    "Создать": "new.png",
+    "Открыть": "open.png",
+    "Сохранить как": "save.png",
+    "Отменить": "undo.png",
+    "Повторить": "redo.png",
+    "Копировать": "copy.png",
+    "Вырезать": "cut.png",
+    "Вставить": "paste.png",
+    "пуск": "pusk.png",
+}
+WINDOW_ICON = "ico.ico"
+
+
+def resource_path(name):
+    """Путь к файлу из каталога icons - рядом со скриптом или внутри сборки PyInstaller."""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, "icons", name)
+
+
+class IconLoader:
+    """Отложенная загрузка иконок кнопок после показа окна."""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self.images = {}
+        self.pending = []
+
+    def add(self, button, name):
+        self.pending.append((button, name))
+
+    def start(self):
+        self.widget.after_idle(self.step)
+
+    def step(self):
+        if not self.pending:
+            return
+        button, name = self.pending.pop(0)
+        image = self.load(ICON_FILES.get(name))
+        if image is not None:
+            button.configure(image=image)
+            button.image = image
+        self.widget.after_idle(self.step)
+
+    def load(self, file_name):
+        if file_name is None:
+            return None
+        if file_name not in self.images:
+            path = resource_path(file_name)
+            image = None
+            if os.path.exists(path):
+                try:
+                    image = tk.PhotoImage(file=path, master=self.widget)
+                except tk.TclError:
+                    pass
+            self.images[file_name] = image
+        return self.images[file_name]
+
+
+def set_window_icon(root):
+    """Иконка окна, если файл есть и формат поддерживается платформой."""
+    path = resource_path(WINDOW_ICON)
+    if os.path.exists(path):
+        try:
+            root.iconbitmap(path)
+        except tk.TclError:
+            pass
@@ -0,0 +1,316 @@
+"""Локальный сервис анализа выражений: HTTP/JSON на localhost или Unix-сокете.
+
+Пример запуска:
+    python service.py --port 8765 --workers 4
+    curl -s localhost:8765/analyze -d '{"text": "2*(3+4)"}'
+    curl -s localhost:8765/stats
+
+Запросы POST /analyze собираются в пачки (до --batch-size запросов или
+--batch-delay-ms ожидания) и разбираются в пуле процессов. Очередь
+запросов ограничена: когда пул не успевает и очередь заполнена, сервис
+сразу отвечает 503, а не накапливает запросы. GET /stats возвращает число
+запросов и перцентили задержки.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import analyzer
+from analyzer import COLUMNS
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Overloaded(Exception):
+    pass
+
+
+# === Работа в пуле процессов ===
+def analyze_batch(items):
+    """Анализ пачки запросов (текст, переменные) в рабочем процессе; ответы - словари для JSON."""
+    responses = []
+    for text, variables in items:
+        analysis = analyzer.analyze(text, "service", variables, cache=analyzer.process_cache)
+        result, error = analyzer.json_result(analysis)
+        responses.append({
+            "diagnostics": [dict(zip(COLUMNS, row)) for row in analysis["diagnostics"]],
+            "poliz": analysis["poliz"],
+            "result": result,
+            "error": error,
+        })
+    return responses
+
+
+# === Пачки запросов и противодавление ===
+class Batcher:
+    """Сбор одновременных запросов в пачки для пула процессов.
+
+    Запросы ждут в очереди не больше queue_size штук; одновременно в пуле
+    не больше max_inflight пачек. Если очередь заполнена, submit сразу
+    выбрасывает Overloaded.
+    """
+
+    def __init__(self, executor, batch_size=64, batch_delay=0.002, queue_size=1024, max_inflight=8):
+        self.executor = executor
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.queue = asyncio.Queue(queue_size)
+        self.slots = asyncio.Semaphore(max_inflight)
+        self.batches = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((item, future))
+        except asyncio.QueueFull:
+            raise Overloaded("очередь запросов заполнена") from None
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self.slots.acquire()
+            self.batches += 1
+            asyncio.ensure_future(self.process(batch))
+
+    async def process(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(self.executor, analyze_batch, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+        finally:
+            self.slots.release()
+
+
+# === Задержки ===
+class LatencyStats:
+    """Задержки последних size запросов и перцентили по ним."""
+
+    def __init__(self, size=10000):
+        self.samples = deque(maxlen=size)
+        self.total = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.total += 1
+
+    def percentiles(self, points=(50, 90, 99)):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {f"p{point}": round(ordered[min(len(ordered) - 1, len(ordered) * point // 100)] * 1000, 3)
+                for point in points}
+
+
+# === HTTP ===
+async def read_request(reader, max_body):
+    """Запрос HTTP/1.1: (метод, путь, заголовки, тело) или None, если соединение закрыто."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "неверная строка запроса") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HttpError(400, "неверный Content-Length") from None
+    if length > max_body:
+        raise HttpError(413, f"тело запроса больше {max_body} байт")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def write_response(writer, status, payload, keep_alive=True):
+    try:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    except (TypeError, ValueError) as e:
+        status = 500
+        body = json.dumps({"error": f"ответ не переводится в JSON: {e}"}, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+    if status == 503:
+        head += "Retry-After: 1\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+def parse_analyze_request(body):
+    try:
+        request = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise HttpError(400, "тело запроса - не JSON") from None
+    if not isinstance(request, dict) or not isinstance(request.get("text"), str):
+        raise HttpError(400, "ожидался объект с полем text (строка)")
+    variables = request.get("variables")
+    if variables is not None:
+        if not isinstance(variables, dict) or not all(
+                isinstance(name, str) and isinstance(value, int) and not isinstance(value, bool)
+                for name, value in variables.items()):
+            raise HttpError(400, "variables - объект с целыми значениями")
+    return request["text"], variables
+
+
+class Service:
+    def __init__(self, batcher, max_body=1 << 20):
+        self.batcher = batcher
+        self.max_body = max_body
+        self.latency = LatencyStats()
+        self.started = time.time()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, self.max_body)
+                except HttpError as e:
+                    write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/analyze":
+            return 404, {"error": f"нет ресурса {path}"}
+        if method != "POST":
+            return 405, {"error": "ожидался POST"}
+
+        start = time.perf_counter()
+        try:
+            item = parse_analyze_request(body)
+            response = await self.batcher.submit(item)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except Overloaded as e:
+            self.latency.rejected += 1
+            return 503, {"error": str(e)}
+        except Exception as e:
+            self.latency.failed += 1
+            return 503, {"error": f"ошибка пула: {e}"}
+        self.latency.record(time.perf_counter() - start)
+        return 200, response
+
+    def stats(self):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.latency.total,
+            "rejected": self.latency.rejected,
+            "failed": self.latency.failed,
+            "batches": self.batcher.batches,
+            "queued": self.batcher.queue.qsize(),
+            "latency_ms": self.latency.percentiles(),
+        }
+
+
+async def serve(args):
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=analyzer.init_process_cache,
+                             initargs=(args.cache_size,)) as executor:
+        batcher = Batcher(executor, args.batch_size, args.batch_delay_ms / 1000, args.queue_size, workers * 2)
+        batcher.start()
+        service = Service(batcher, args.max_body)
+        if args.unix:
+            server = await asyncio.start_unix_server(service.handle, path=args.unix)
+            where = args.unix
+        else:
+            server = await asyncio.start_server(service.handle, args.host, args.port)
+            where = f"http://{args.host}:{args.port}"
+        print(f"Сервис анализа: {where}, процессов: {workers}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            print(f"Итог: {json.dumps(service.stats(), ensure_ascii=False)}", file=sys.stderr)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Локальный сервис анализа выражений")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="адрес (по умолчанию только localhost)")
+    arg_parser.add_argument("--port", type=int, default=8765, help="порт HTTP")
+    arg_parser.add_argument("--unix", help="путь к Unix-сокету вместо TCP")
+    arg_parser.add_argument("--workers", "-j", type=int, default=None, help="число процессов (по умолчанию - все ядра)")
+    arg_parser.add_argument("--batch-size", type=int, default=64, help="наибольшая пачка запросов")
+    arg_parser.add_argument("--batch-delay-ms", type=float, default=2.0,
+                            help="сколько ждать пополнения пачки, мс")
+    arg_parser.add_argument("--queue-size", type=int, default=1024,
+                            help="длина очереди; при заполнении запросы получают 503")
+    arg_parser.add_argument("--max-body", type=int, default=1 << 20, help="наибольшее тело запроса, байт")
+    arg_parser.add_argument("--cache-size", type=int, default=4096,
+                            help="размер LRU-кэша выражений на процесс (0 - без кэша)")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
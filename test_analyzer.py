@@ -0,0 +1,336 @@
+"""Проверки анализатора: сравнение с исходными реализациями и восстановление после ошибок.
+
+Запуск: python -m pytest -q
+"""
+import io
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from analyzer import (INT64_MAX, INT64_MIN, MAX_ERRORS, AnalysisCache, Parser, analyze, analyze_statements,
+                      compile_expression, evaluate_columns, json_result, lex, run_program, split_statements,
+                      statement_rows, stream_statements)
+
+
+# === Исходный рекурсивный разбор (эталон) ===
+class RecursiveParser:
+    def __init__(self, tokens):
+        self.tokens = tokens + ['EOF']
+        self.pos = 0
+        self.errors = []
+
+    def current(self):
+        return self.tokens[self.pos]
+
+    def match(self, expected):
+        if self.current() == expected:
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        self.E()
+        if self.current() != 'EOF':
+            self.errors.append(f"лишний токен: '{self.current()}'")
+
+    def E(self):
+        self.T()
+        self.A()
+
+    def A(self):
+        if self.current() in ('+', '-'):
+            self.pos += 1
+            self.T()
+            self.A()
+
+    def T(self):
+        self.O()
+        self.B()
+
+    def B(self):
+        if self.current() in ('*', '/'):
+            self.pos += 1
+            self.O()
+            self.B()
+
+    def O(self):
+        if self.current().isdigit():
+            self.pos += 1
+        elif self.match('('):
+            self.E()
+            if not self.match(')'):
+                self.errors.append("ожидалась закрывающая скобка ')'")
+        elif self.current() != 'EOF':
+            self.errors.append(f"ожидался 'num' или '(', найдено: '{self.current()}'")
+            self.pos += 1
+        else:
+            self.errors.append(f"ожидался 'num' или '(', найдено: '{self.current()}'")
+
+
+def token_values(text, identifiers=False):
+    return [token.value for token in lex(text, identifiers) if token.kind != 'invalid']
+
+
+def parse_errors(text, identifiers=False):
+    parser = Parser(token_values(text, identifiers), identifiers)
+    parser.parse()
+    return parser
+
+
+def random_tokens(rng, size):
+    return [rng.choice(['1', '23', '+', '-', '*', '/', '(', ')']) for _ in range(size)]
+
+
+def random_expression(rng, names=(), depth=0):
+    """Правильное выражение грамматики G[<E>] со случайными числами, переменными и скобками."""
+    if depth > 4 or rng.random() < 0.3:
+        operands = ["0", "1", "2", "7", "10", "123456789"] + list(names)
+        return rng.choice(operands)
+    if rng.random() < 0.2:
+        return "(" + random_expression(rng, names, depth + 1) + ")"
+    op = rng.choice("+-*/")
+    return random_expression(rng, names, depth + 1) + f" {op} " + random_expression(rng, names, depth + 1)
+
+
+def outcome(function, *args):
+    """Результат вызова или (тип исключения, сообщение) - для сравнения двух реализаций."""
+    try:
+        return function(*args)
+    except Exception as e:
+        return type(e), str(e)
+
+
+def python_value(text, variables=None):
+    """Эталон: то же выражение, вычисленное Python с целочисленным делением."""
+    return eval(text.replace("/", "//"), {"__builtins__": {}}, dict(variables or {}))
+
+
+# === Синтаксический анализатор ===
+def test_first_error_matches_recursive_descent():
+    rng = random.Random(3)
+    for _ in range(20000):
+        tokens = random_tokens(rng, rng.randint(0, 12))
+        reference = RecursiveParser(list(tokens))
+        reference.parse()
+        parser = Parser(list(tokens))
+        parser.parse()
+        assert parser.errors[:1] == reference.errors[:1], tokens
+        assert bool(parser.errors) == bool(reference.errors), tokens
+
+
+def test_valid_expressions_have_no_errors():
+    for text in ("1", "2*(3+4)", "((1))", "1-2/3*(4+5)", "(" * 500 + "1" + ")" * 500):
+        assert parse_errors(text).errors == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1 + ) + 2 * * 3", ["ожидался 'num' или '(', найдено: ')'",
+                         "ожидался 'num' или '(', найдено: '*'"]),
+    ("(1 2) + * 3", ["ожидалась закрывающая скобка ')'",
+                     "ожидался 'num' или '(', найдено: '*'"]),
+    ("1 ) ) ) 2 * / 3", ["лишний токен: ')'",
+                         "ожидался 'num' или '(', найдено: '/'"]),
+    ("1 2 + * 4", ["лишний токен: '2'", "ожидался 'num' или '(', найдено: '*'"]),
+    ("((1", ["ожидалась закрывающая скобка ')'"]),
+    ("(1 2", ["ожидалась закрывающая скобка ')'"]),
+    ("(1 2 3)", ["ожидалась закрывающая скобка ')'", "ожидалась закрывающая скобка ')'"]),
+    ("1)", ["лишний токен: ')'"]),
+])
+def test_recovery_reports_later_errors(text, expected):
+    parser = parse_errors(text)
+    assert parser.errors == expected
+    assert parser.pos == len(parser.tokens) - 1
+    assert len(parser.positions) == len(parser.errors)
+
+
+def test_error_budget_on_garbage():
+    parser = parse_errors("1 + * ) ( " * 300000)
+    assert parser.aborted
+    assert len(parser.errors) == MAX_ERRORS + 1
+    assert parser.errors[-1] == "слишком много ошибок, разбор прекращён"
+
+
+def test_variable_named_like_end_marker():
+    assert analyze("EOF + 1", variables={"EOF": 2})["result"] == 3
+    assert analyze("1 + EOF", variables={"EOF": 2})["poliz"] == ["1", "EOF", "+"]
+    assert analyze("1 +", variables={})["diagnostics"][0][2] == "ожидался 'num' или '(', найдено: 'EOF'"
+
+
+# === Байт-код ===
+def test_vm_matches_python_evaluation():
+    rng = random.Random(5)
+    for _ in range(3000):
+        text = random_expression(rng)
+        expected = outcome(python_value, text)
+        if isinstance(expected, tuple):
+            expected = (ZeroDivisionError, "Деление на ноль")
+        assert outcome(run_program, compile_expression(text, optimize=False)) == expected, text
+
+
+
+def test_vm_with_variables_matches_python_evaluation():
+    rng = random.Random(6)
+    for _ in range(3000):
+        text = random_expression(rng, ("x", "y"))
+        variables = {"x": rng.randint(-5, 5), "y": rng.randint(-10 ** 20, 10 ** 20)}
+        expected = outcome(python_value, text, variables)
+        if isinstance(expected, tuple):
+            expected = (ZeroDivisionError, "Деление на ноль")
+        assert outcome(run_program, compile_expression(text, optimize=False), variables) == expected, text
+    with pytest.raises(ValueError, match="Не заданы значения переменных: y"):
+        run_program(compile_expression("x + y"), {"x": 1})
+
+
+# === Оптимизация ПОЛИЗ ===
+def test_optimized_program_matches_raw_program():
+    rng = random.Random(7)
+    for _ in range(5000):
+        text = random_expression(rng, ("x", "y"))
+        raw = compile_expression(text, optimize=False)
+        optimized = compile_expression(text)
+        for variables in ({"x": rng.randint(-3, 3), "y": rng.randint(-3, 3)}, {"x": 0}, {}):
+            assert outcome(run_program, optimized, variables) == outcome(run_program, raw, variables), text
+
+
+def test_multiplication_by_zero_keeps_variables():
+    program = compile_expression("x*0")
+    assert program.names == ("x",)
+    with pytest.raises(ValueError):
+        run_program(program, {})
+    assert run_program(program, {"x": 7}) == 0
+    assert compile_expression("(2+3)*0").code.tolist() == [0]
+
+
+# === Вывод результатов ===
+def test_json_result_of_huge_integer():
+    assert json_result(analyze("2*(3+4)")) == (14, None)
+    result, error = json_result(analyze("*".join(["99999999999"] * 500)))
+    assert result is None and error.startswith("результат длиннее")
+
+
+# === Вычисление по столбцам ===
+def check_columns(program, rows, int64=True):
+    """Сверка evaluate_columns на столбцах x и y с run_program для каждой строки rows."""
+    np = pytest.importorskip("numpy")
+    expected = [outcome(run_program, program, row) for row in rows]
+    columns = {name: np.array([row[name] for row in rows], dtype=np.int64 if int64 else object)
+               for name in ("x", "y")}
+    if any(isinstance(value, tuple) for value in expected):
+        with pytest.raises(ZeroDivisionError):
+            evaluate_columns(program, columns, int64)
+        return
+    assert [int(value) for value in evaluate_columns(program, columns, int64)] == expected
+
+
+def test_columns_match_run_program():
+    rng = random.Random(10)
+    for _ in range(500):
+        program = compile_expression(random_expression(rng, ("x", "y")))
+        rows = [{"x": rng.randint(-10, 10), "y": rng.randint(-10 ** 30, 10 ** 30)} for _ in range(8)]
+        check_columns(program, rows, int64=False)
+
+
+def test_int64_columns_match_run_program():
+    rng = random.Random(11)
+    edge = [0, 1, -1, 2, INT64_MAX, INT64_MIN, INT64_MAX // 2, INT64_MIN // 2, 3037000500, -3037000500]
+    for _ in range(1500):
+        program = compile_expression(random_expression(rng, ("x", "y")), optimize=rng.random() < 0.5)
+        rows = [{"x": rng.choice(edge + [rng.randint(-100, 100)]), "y": rng.choice(edge)} for _ in range(8)]
+        check_columns(program, rows)
+
+
+# === Кэш результатов анализа ===
+def test_cached_analysis_matches_uncached():
+    rng = random.Random(12)
+    cache = AnalysisCache(maxsize=64)
+    for number in range(3000):
+        tokens = random_tokens(rng, rng.randint(0, 8))
+        if rng.random() < 0.1:
+            tokens.append("#")
+        text = rng.choice([" ", "", "  "]).join(tokens)
+        line = number % 5 + 1
+        assert analyze(text, "a.txt", cache=cache, line=line) == analyze(text, "a.txt", line=line), text
+    assert cache.stats()["hits"] > 0 and len(cache.entries) <= 64
+
+
+def test_cache_key_ignores_formatting_but_not_variables():
+    cache = AnalysisCache()
+    analyze("1+2*3", cache=cache)
+    assert analyze(" 1 + 2 *3 ", "b.txt", cache=cache, line=4)["diagnostics"] == []
+    assert cache.stats()["hits"] == 1
+
+    assert analyze("x+1", variables={"x": 1}, cache=cache)["result"] == 2
+    assert analyze("x+1", variables={"x": 5}, cache=cache)["result"] == 6
+    assert analyze("1 +", "c.txt", cache=cache, line=7)["diagnostics"][0][4:] == ("c.txt", "7")
+    assert analyze("1+", "d.txt", cache=cache, line=2)["diagnostics"][0][4:] == ("d.txt", "2")
+
+
+def test_cache_evicts_least_recently_used():
+    cache = AnalysisCache(maxsize=2)
+    for text in ("1", "2", "1", "3"):
+        analyze(text, cache=cache)
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 3, "evictions": 1}
+    analyze("1", cache=cache)
+    assert cache.stats()["hits"] == 2
+
+    disabled = AnalysisCache(maxsize=0)
+    analyze("1", cache=disabled)
+    assert disabled.stats()["size"] == 0
+
+
+# === Документ из независимых операторов ===
+def random_document(rng, lines):
+    return "\n".join(rng.choice(["1+2", "  ", "", "2*(3", "4;5+", ")6", "7 / 0", "8;;9"]) for _ in range(lines))
+
+
+@pytest.mark.parametrize("split, expected", [
+    ("line", [(1, "1+2"), (3, " 2*(3;"), (4, "4")]),
+    ("statement", [(1, "1+2\n\n 2*(3"), (4, "\n4\n")]),
+])
+def test_split_statements(split, expected):
+    assert list(split_statements("1+2\n\n 2*(3;\n4\n", split)) == expected
+
+
+def test_statement_split_keeps_line_numbers():
+    rng = random.Random(13)
+    for _ in range(500):
+        text = random_document(rng, rng.randint(1, 10))
+        lines = text.split("\n")
+        for line, statement in split_statements(text, "statement"):
+            assert statement.lstrip().split("\n")[0] in lines[line - 1], (text, line)
+
+
+def test_statements_match_separate_analysis():
+    rng = random.Random(14)
+    text = random_document(rng, 3000)
+    statements = list(split_statements(text, "line"))
+    expected = [(line, analyze(statement, "doc.txt", line=line)) for line, statement in statements]
+    assert analyze_statements(statements, "doc.txt", cache=AnalysisCache()) == expected
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert analyze_statements(statements, "doc.txt", executor=executor, chunk_size=100) == expected
+    assert analyze_statements(statements, cancelled=lambda: True) is None
+
+
+def test_statement_rows_limit():
+    analyses = analyze_statements(split_statements("1+\n" * 30))
+    rows = statement_rows(analyses, "doc.txt", limit=10)
+    assert len(rows) == 11 and rows[-1][0] == "E004"
+    assert [row[5] for row in rows[:10]] == [f"{line}" for line in range(1, 11)]
+    assert statement_rows(analyze_statements(split_statements("1\n2/0")), "doc.txt")[0][:3] == \
+        ("E003", "Ошибка вычисления", "Деление на ноль")
+
+
+def test_stream_statements_match_split_statements():
+    rng = random.Random(15)
+    for _ in range(2000):
+        text = random_document(rng, rng.randint(0, 12))
+        split = rng.choice(["line", "statement"])
+        block_size = rng.randint(1, 8)
+        streamed = list(stream_statements(io.StringIO(text), split, block_size))
+        assert streamed == list(split_statements(text, split)), (text, split, block_size)
+
+
+def test_stream_statements_skips_long_statements():
+    text = "1+2\n" + "1+" * 50 + "1\n3"
+    assert list(stream_statements(io.StringIO(text), "line", 7, max_length=20)) == [(1, "1+2"), (2, None), (3, "3")]
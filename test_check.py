@@ -0,0 +1,49 @@
+"""Проверки пакетной проверки файлов (check.py).
+
+Запуск: python -m pytest -q
+"""
+import json
+
+import pytest
+
+from check import main
+
+
+@pytest.fixture
+def expressions(tmp_path):
+    (tmp_path / "good.txt").write_text("2*(3+4)", encoding="utf-8")
+    nested = tmp_path / "nested"
+    nested.mkdir()
+    (nested / "bad.txt").write_text("1 + ) 2", encoding="utf-8")
+    (nested / "skipped.log").write_text("1 +", encoding="utf-8")
+    return tmp_path
+
+
+def report(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize("split", [None, "line"])
+def test_check_directory(expressions, capsys, split):
+    argv = ["check", str(expressions), "--jobs", "1"] + (["--split", split] if split else [])
+    assert main(argv) == 1
+    rows = report(capsys)
+    assert rows and {row["file_path"] for row in rows} == {str(expressions / "nested" / "bad.txt")}
+    assert main(["check", str(expressions / "good.txt"), "--jobs", "1"]) == 0
+    assert report(capsys) == []
+
+
+@pytest.mark.parametrize("command", [["check"], ["check", "--split", "line"], ["stream"]])
+def test_missing_path_is_an_error(tmp_path, capsys, command):
+    missing = str(tmp_path / "does-not-exist.txt")
+    assert main(command + [missing, "--jobs", "1"]) == 1
+    assert "E000" in capsys.readouterr().out
+
+
+def test_stream_results(expressions, capsys):
+    (expressions / "lines.txt").write_text("1+2\n\n2*x\n2/0", encoding="utf-8")
+    assert main(["stream", str(expressions / "lines.txt"), "--jobs", "1"]) == 1
+    records = report(capsys)
+    assert [(record["line"], record["result"]) for record in records] == [(1, 3), (3, None), (4, None)]
+    assert records[1]["diagnostics"][0]["code"] == "E001"
+    assert records[2]["error"] == "Деление на ноль"
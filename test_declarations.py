@@ -0,0 +1,166 @@
+"""Проверки анализа объявлений: сравнение с исходными реализациями из vin.py.
+
+Запуск: python -m pytest -q
+"""
+import random
+import re
+import warnings
+
+from declarations import KeywordMatcher, check_keywords_and_report_errors, parse_and_evaluate_expression
+
+
+# === Исходные реализации (эталон) ===
+def levenshtein(s1, s2):
+    if len(s1) < len(s2):
+        return levenshtein(s2, s1)
+    if len(s2) == 0:
+        return len(s1)
+
+    prev_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        curr_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = prev_row[j + 1] + 1
+            deletions = curr_row[j] + 1
+            substitutions = prev_row[j] + (c1 != c2)
+            curr_row.append(min(insertions, deletions, substitutions))
+        prev_row = curr_row
+
+    return prev_row[-1]
+
+
+def reference_check(cleaned_text):
+    keywords = ['const', 'val', 'int']
+    required_symbols = [':', '=', ';']
+    tokens = cleaned_text.split()
+    errors = []
+    found_keywords = set()
+    mistaken_keywords = set()
+
+    has_equal = '=' in cleaned_text
+    value_token = None
+    if has_equal:
+        parts = cleaned_text.split('=')
+        if len(parts) > 1:
+            expr_part = parts[1]
+            expr_part = expr_part.split(';')[0].strip()
+            value_token = expr_part
+    else:
+        errors.append("нет токена (=)")
+
+    for token in tokens:
+        if token in keywords:
+            found_keywords.add(token)
+            continue
+
+        if token in [':', '=', ';']:
+            continue
+
+        if value_token and token in value_token:
+            continue
+
+        if token and token[0].isdigit():
+            errors.append(f"токен не может начинаться с числа ({token})")
+
+        for kw in keywords:
+            if kw in token and any(char.isdigit() for char in token):
+                errors.append(f"ожидалось ключевое слово ({kw}) – встретился идентификатор '{token}'")
+                mistaken_keywords.add(kw)
+                break
+            elif len(token) >= len(kw) - 1 and levenshtein(token, kw) <= 2:
+                errors.append(f"ожидалось ключевое слово ({kw}) – встретился идентификатор '{token}'")
+                mistaken_keywords.add(kw)
+                break
+
+    for kw in keywords:
+        if kw not in found_keywords and kw not in mistaken_keywords:
+            errors.append(f"нет токена ({kw})")
+
+    for symbol in required_symbols:
+        if symbol not in cleaned_text:
+            errors.append(f"нет токена ({symbol})")
+
+    return errors
+
+
+def reference_evaluate(expression):
+    try:
+        if not re.fullmatch(r'[\d+\-*/().\s]+', expression):
+            return "Выражение содержит недопустимые символы."
+        result = eval(expression)
+        return result
+    except ZeroDivisionError:
+        return "Ошибка: деление на ноль."
+    except Exception as e:
+        return f"Ошибка вычисления: {str(e)}"
+
+
+def random_word(rng):
+    return "".join(rng.choice("constvalint01x") for _ in range(rng.randint(0, 7)))
+
+
+def random_declaration(rng):
+    parts = [rng.choice(["const", "val", "int", "cnst", "vall", "in7", "1x", random_word(rng)])
+             for _ in range(rng.randint(0, 4))]
+    for symbol in (":", "=", ";", "=", random_word(rng)):
+        if rng.random() < 0.6:
+            parts.insert(rng.randint(0, len(parts)), symbol)
+    return rng.choice([" ", "  ", "\t"]).join(parts)
+
+
+def random_arithmetic(rng, depth=0):
+    if depth > 3 or rng.random() < 0.3:
+        return rng.choice(["0", "1", "2", "7", "10", "2.5", "0.0"])
+    if rng.random() < 0.2:
+        return rng.choice(["-", "+", ""]) + "(" + random_arithmetic(rng, depth + 1) + ")"
+    return random_arithmetic(rng, depth + 1) + rng.choice("+-*/") + random_arithmetic(rng, depth + 1)
+
+
+# === Ключевые слова ===
+def test_keyword_matcher_matches_full_levenshtein():
+    rng = random.Random(1)
+    matcher = KeywordMatcher()
+    for _ in range(20000):
+        token = random_word(rng)
+        expected = None
+        for kw in ('const', 'val', 'int'):
+            if kw in token and any(char.isdigit() for char in token) or \
+                    len(token) >= len(kw) - 1 and levenshtein(token, kw) <= 2:
+                expected = kw
+                break
+        assert matcher.match(token) == expected, token
+
+
+def test_check_matches_original():
+    rng = random.Random(2)
+    for _ in range(20000):
+        text = random_declaration(rng)
+        assert check_keywords_and_report_errors(text) == reference_check(text), text
+
+
+# === Вычисление значения ===
+def test_evaluation_matches_eval():
+    rng = random.Random(4)
+    for _ in range(20000):
+        expression = random_arithmetic(rng)
+        assert parse_and_evaluate_expression(expression) == reference_evaluate(expression), expression
+
+
+def test_malformed_expressions_are_errors():
+    rng = random.Random(6)
+    for _ in range(20000):
+        expression = random_arithmetic(rng)
+        position = rng.randint(0, len(expression))
+        expression = expression[:position] + rng.choice("()+*/ 1x") + expression[position:]
+        # '**' - возведение в степень у eval, в грамматике объявлений его нет
+        if "**" in expression:
+            continue
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)
+            expected = reference_evaluate(expression)
+        result = parse_and_evaluate_expression(expression)
+        if isinstance(expected, str):
+            # eval вычисляет аргументы "1(0/0)" до ошибки вызова, поэтому текст ошибки может отличаться
+            assert isinstance(result, str), expression
+        else:
+            assert result == expected, expression
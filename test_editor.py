@@ -0,0 +1,35 @@
+"""Проверки общих элементов редактора, не требующие окна.
+
+Запуск: python -m pytest -q
+"""
+import os
+
+import pytest
+
+from editor import UMASK, write_atomic
+
+
+@pytest.mark.skipif(os.name == "nt", reason="права доступа POSIX")
+def test_write_atomic_modes(tmp_path):
+    path = tmp_path / "new.txt"
+    write_atomic(str(path), "1+2")
+    assert path.read_text(encoding="utf-8") == "1+2"
+    assert path.stat().st_mode & 0o777 == 0o666 & ~UMASK
+
+    os.chmod(path, 0o640)
+    write_atomic(str(path), "3*4")
+    assert path.read_text(encoding="utf-8") == "3*4"
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["new.txt"]
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink") or os.name == "nt", reason="символические ссылки POSIX")
+def test_write_atomic_through_symlink(tmp_path):
+    target = tmp_path / "real.txt"
+    target.write_text("old", encoding="utf-8")
+    link = tmp_path / "link.txt"
+    link.symlink_to(target)
+    write_atomic(str(link), "new")
+    assert link.is_symlink()
+    assert target.read_text(encoding="utf-8") == "new"
+    assert sorted(os.listdir(tmp_path)) == ["link.txt", "real.txt"]
@@ -0,0 +1,101 @@
+"""Проверки LSP-сервера: инкрементальные правки против разбора документа заново.
+
+Запуск: python -m pytest -q
+"""
+import io
+import os
+import random
+import subprocess
+import sys
+
+from lsp import Document, read_message, to_index, write_message
+
+LINES = ["1 + 2", "2 * (3 + 4)", "", "1 + ) 2", "(1", "5 / 0", "1 # 2", "x + 1", "(7)", "1 😀 2"]
+
+
+def run_server(messages, raw=b""):
+    """Запуск lsp.py с пачкой сообщений на stdin: код возврата и сообщения из stdout."""
+    stream = io.BytesIO()
+    for message in messages:
+        write_message(stream, dict(message, jsonrpc="2.0"))
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lsp.py")
+    process = subprocess.run([sys.executable, server], input=stream.getvalue() + raw,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30)
+    output = io.BytesIO(process.stdout)
+    replies = []
+    while True:
+        message = read_message(output)
+        if message is None:
+            return process.returncode, replies
+        replies.append(message)
+
+
+def random_position(rng, lines):
+    line = rng.randrange(len(lines))
+    return {"line": line, "character": rng.randint(0, len(lines[line]) + 1)}
+
+
+def edited_text(lines, change):
+    """Текст документа после правки change, собранный напрямую по смещениям."""
+    start, end = change["range"]["start"], change["range"]["end"]
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+    text = "\n".join(lines)
+    begin = offsets[start["line"]] + to_index(lines[start["line"]], start["character"])
+    finish = offsets[end["line"]] + to_index(lines[end["line"]], end["character"])
+    return text[:begin] + change["text"] + text[finish:]
+
+
+def test_ranged_changes_match_fresh_document():
+    rng = random.Random(9)
+    for _ in range(200):
+        document = Document("file:///test", "\n".join(rng.choice(LINES) for _ in range(rng.randint(1, 6))))
+        document.diagnostics()
+        for _ in range(10):
+            start, end = sorted((random_position(rng, document.lines), random_position(rng, document.lines)),
+                                key=lambda position: (position["line"], position["character"]))
+            inserted = rng.choice(["", "1", " + ", ")", "\n", "\n(2 * 3)\n", rng.choice(LINES)])
+            change = {"range": {"start": start, "end": end}, "text": inserted}
+            expected = edited_text(document.lines, change)
+            document.apply_change(change)
+            assert "\n".join(document.lines) == expected
+            if rng.random() < 0.5:
+                assert document.diagnostics() == Document("file:///fresh", expected).diagnostics()
+        assert document.diagnostics() == Document("file:///fresh", "\n".join(document.lines)).diagnostics()
+
+
+def test_full_change_replaces_document():
+    document = Document("file:///test", "1 +\n2")
+    assert len(document.diagnostics()) == 1
+    document.apply_change({"text": "1 + 2"})
+    assert document.lines == ["1 + 2"]
+    assert document.diagnostics() == []
+
+
+def test_pipelined_changes_are_published_before_shutdown():
+    uri = "file:///burst.txt"
+    messages = [
+        {"id": 1, "method": "initialize", "params": {}},
+        {"method": "textDocument/didOpen", "params": {"textDocument": {"uri": uri, "text": "1 +"}}},
+    ]
+    for number in range(200):
+        messages.append({"method": "textDocument/didChange", "params": {
+            "textDocument": {"uri": uri},
+            "contentChanges": [{"range": {"start": {"line": 0, "character": 3},
+                                          "end": {"line": 0, "character": 3}}, "text": "\n1 +"}],
+        }})
+    messages += [{"id": 2, "method": "shutdown"}, {"method": "exit"}]
+    code, replies = run_server(messages)
+    assert code == 0
+    published = [reply for reply in replies if reply.get("method") == "textDocument/publishDiagnostics"]
+    shutdown = next(index for index, reply in enumerate(replies) if reply.get("id") == 2)
+    assert published and replies.index(published[-1]) < shutdown
+    assert len(published[-1]["params"]["diagnostics"]) == 201
+
+
+def test_malformed_message_stops_server():
+    code, replies = run_server([{"id": 1, "method": "initialize", "params": {}}], b"Content-Length: x\r\n\r\n{}")
+    assert code == 1 and replies[0]["id"] == 1
+    code, replies = run_server([], b"Content-Length: 2\r\n\r\n[]")
+    assert code == 1 and replies == []
@@ -1,16 +1,18 @@
-import re
 import tkinter as tk
-from tkinter import messagebox, filedialog, PhotoImage
+from tkinter import messagebox, filedialog
 from tkinter import ttk
-import os
+import sys
+
+from editor import (BackgroundSaver, DiagnosticsTable, FileLoader, LineNumbers, StageTimings, cancel_loading,
+                    close_after_first_paint, content_hash, finish_loading, is_modified, start_save)
+from resources import IconLoader, set_window_icon
+
+# Проверка объявлений (declarations) и профилировщик импортируются при
+# первом анализе, чтобы не задерживать появление окна
 
 def update_line_numbers(text_area, line_numbers):
-    """Обновление номеров строк."""
-    line_numbers.config(state=tk.NORMAL)
-    line_numbers.delete("1.0", tk.END)
-    line_count = text_area.index(tk.END).split(".")[0]
-    line_numbers.insert(tk.END, "\n".join(str(i) for i in range(1, int(line_count))))
-    line_numbers.config(state=tk.DISABLED)
+    """Обновление номеров строк (перерисовываются только видимые строки)."""
+    line_numbers.schedule_redraw()
 
 def on_text_change(event=None, text_area=None, line_numbers=None):
     """Обработчик изменения текста."""
@@ -24,15 +26,16 @@ def create_document():
     frame = tk.Frame(new_tab)
     frame.pack(fill=tk.BOTH, expand=True)
     
-    line_numbers = tk.Text(frame, width=4, padx=3, takefocus=0, border=0, background="lightgray", state=tk.DISABLED)
-    line_numbers.pack(side=tk.LEFT, fill=tk.Y)
-    
     text_area = tk.Text(frame, undo=True, font=("Arial", selected_size.get()))
+    line_numbers = LineNumbers(frame, text_area)
+    line_numbers.pack(side=tk.LEFT, fill=tk.Y)
     text_area.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
     text_area.bind("<KeyRelease>", lambda event: on_text_change(event, text_area, line_numbers))
 
     new_tab.text_area = text_area
+    new_tab.line_numbers = line_numbers
     new_tab.file_path = None
+    new_tab.saved_hash = content_hash("")
     
     update_line_numbers(text_area, line_numbers)
 
@@ -46,17 +49,23 @@ def open_document():
         frame = tk.Frame(new_tab)
         frame.pack(fill=tk.BOTH, expand=True)
         
-        line_numbers = tk.Text(frame, width=4, padx=3, takefocus=0, border=0, background="lightgray", state=tk.DISABLED)
-        line_numbers.pack(side=tk.LEFT, fill=tk.Y)
-        
         text_area = tk.Text(frame, undo=True, font=("Arial", selected_size.get()))
+        line_numbers = LineNumbers(frame, text_area)
+        line_numbers.pack(side=tk.LEFT, fill=tk.Y)
         text_area.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
         text_area.bind("<KeyRelease>", lambda event: on_text_change(event, text_area, line_numbers))
         
-        with open(file_path, "r", encoding="utf-8") as file:
-            text_area.insert(tk.END, file.read())
+        new_tab.loader = FileLoader(
+            text_area, file_path,
+            on_progress=lambda done, total: status_var.set(
+                f"Загрузка {file_path.split('/')[-1]}: {done * 100 // max(total, 1)}% (Esc - отмена)"),
+            on_done=lambda cancelled, error: finish_loading(notebook, status_var, new_tab, cancelled, error),
+        )
+        new_tab.saved_hash = None
+        new_tab.loader.start()
         
         new_tab.text_area = text_area
+        new_tab.line_numbers = line_numbers
         new_tab.file_path = file_path
         
         update_line_numbers(text_area, line_numbers)
@@ -65,11 +74,9 @@ def save_document():
     """Сохранить документ."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
         file_path = current_tab.file_path
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(text_area.get("1.0", tk.END))
+            start_save(saver, status_var, current_tab, file_path)
         else:
             save_document_as()
 
@@ -77,14 +84,10 @@ def save_document_as():
     """Сохранить документ с новым именем."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
         file_path = filedialog.asksaveasfilename(defaultextension=".txt", 
                                                    filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(text_area.get("1.0", tk.END))
-            notebook.tab(current_tab, text=file_path.split("/")[-1])
-            current_tab.file_path = file_path
+            start_save(saver, status_var, current_tab, file_path, notebook)
 
 def update_font_size(*args):
     """Обновить размер шрифта в активной вкладке, не меняя размер окна."""
@@ -92,6 +95,7 @@ def update_font_size(*args):
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
         current_tab.text_area.config(font=("Arial", size))
+        current_tab.line_numbers.schedule_redraw()
 
 def get_active_text_area():
     """Получить текстовое поле активной вкладки."""
@@ -116,176 +120,54 @@ def setup_hotkeys(root):
 
 
 # === Основной анализатор ===
-def lexical_analyzer(text, file_path):
-    # --- Очистка текста и удаление невалидных символов ---
-    def clean_and_report_invalid_fragments(text):
-        result = ''
-        invalid_fragments = []
-        buffer = ''
-        i = 0
-
-        def is_valid_char(c):
-            return c.isalnum() or c == '_' or c in 'аА' or c in "+-*/()"
-
-        while i < len(text):
-            c = text[i]
-
-            if c in '+-':
-                if i + 1 < len(text) and text[i + 1].isdigit():
-                    buffer += c
-                    i += 1
-                    buffer += text[i]
-                    i += 1
-                    while i < len(text) and text[i].isdigit():
-                        buffer += text[i]
-                        i += 1
-                    result += buffer
-                    buffer = ''
-                    continue
-                else:
-                    buffer += c
-                    i += 1
-                    continue
-
-            if is_valid_char(c):
-                buffer += c
-            else:
-                if buffer:
-                    result += buffer
-                    buffer = ''
-
-                if c.isspace() or c in ":=;":
-                    result += c
-                else:
-                    invalid_segment = ''
-                    while i < len(text) and not is_valid_char(text[i]) and not text[i].isspace() and text[i] not in ":=;":
-                        invalid_segment += text[i]
-                        i += 1
-                    if invalid_segment:
-                        invalid_fragments.append(invalid_segment)
-                    continue
-            i += 1
-
-        if buffer:
-            result += buffer
-
-        report = ""
-        for idx, fragment in enumerate(invalid_fragments, 1):
-            report += f"{idx} удалённый фрагмент - {fragment}\n"
-
-        return report, result
-
-    # --- Проверка ключевых слов и структуры ---
-    def check_keywords_and_report_errors(cleaned_text):
-        keywords = ['const', 'val', 'int']
-        required_symbols = [':', '=', ';']
-        tokens = cleaned_text.split()
-        errors = []
-        found_keywords = set()
-        mistaken_keywords = set()
-
-        has_equal = '=' in cleaned_text
-        value_token = None
-        if has_equal:
-            parts = cleaned_text.split('=')
-            if len(parts) > 1:
-                expr_part = parts[1]
-                expr_part = expr_part.split(';')[0].strip()
-                value_token = expr_part
-        else:
-            errors.append("нет токена (=)")
-
-        for token in tokens:
-            if token in keywords:
-                found_keywords.add(token)
-                continue
-
-            if token in [':', '=', ';']:
-                continue
-
-            if value_token and token in value_token:
-                continue
-
-            if token and token[0].isdigit():
-                errors.append(f"токен не может начинаться с числа ({token})")
-
-            for kw in keywords:
-                if kw in token and any(char.isdigit() for char in token):
-                    errors.append(f"ожидалось ключевое слово ({kw}) – встретился идентификатор '{token}'")
-                    mistaken_keywords.add(kw)
-                    break
-                elif len(token) >= len(kw) - 1 and levenshtein(token, kw) <= 2:
-                    errors.append(f"ожидалось ключевое слово ({kw}) – встретился идентификатор '{token}'")
-                    mistaken_keywords.add(kw)
-                    break
-
-        for kw in keywords:
-            if kw not in found_keywords and kw not in mistaken_keywords:
-                errors.append(f"нет токена ({kw})")
-
-        for symbol in required_symbols:
-            if symbol not in cleaned_text:
-                errors.append(f"нет токена ({symbol})")
-
-        return errors
-
-    # --- Расстояние Левенштейна ---
-    def levenshtein(s1, s2):
-        if len(s1) < len(s2):
-            return levenshtein(s2, s1)
-        if len(s2) == 0:
-            return len(s1)
-
-        prev_row = list(range(len(s2) + 1))
-        for i, c1 in enumerate(s1):
-            curr_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = prev_row[j + 1] + 1
-                deletions = curr_row[j] + 1
-                substitutions = prev_row[j] + (c1 != c2)
-                curr_row.append(min(insertions, deletions, substitutions))
-            prev_row = curr_row
-
-        return prev_row[-1]
-
-    # --- Безопасное вычисление выражения ---
-    def parse_and_evaluate_expression(expression):
-        try:
-            if not re.fullmatch(r'[\d+\-*/().\s]+', expression):
-                return "Выражение содержит недопустимые символы."
-            result = eval(expression)
-            return result
-        except ZeroDivisionError:
-            return "Ошибка: деление на ноль."
-        except Exception as e:
-            return f"Ошибка вычисления: {str(e)}"
+# Коды строк диагностики: невалидный фрагмент и ошибка объявления
+CODE_INVALID = "E001"
+CODE_ERROR = "E002"
+DIAGNOSTIC_CODES = (CODE_INVALID, CODE_ERROR)
 
+def lexical_analyzer(text, file_path, profiler=None):
+    from declarations import check_keywords_and_report_errors, clean_and_report_invalid_fragments, parse_and_evaluate_expression
     # === Этап анализа ===
+    if profiler is not None:
+        profiler.start("clean")
     report, cleaned_text = clean_and_report_invalid_fragments(text)
+    if profiler is not None:
+        profiler.stop(len(cleaned_text.split()))
+        profiler.start("keywords")
     errors = check_keywords_and_report_errors(cleaned_text)
+    if profiler is not None:
+        profiler.stop(len(cleaned_text.split()))
 
-    for row in output_table.get_children():
-        output_table.delete(row)
-
+    rows = []
     for idx, line in enumerate(report.strip().split('\n'), start=1):
         if line.strip():
-            output_table.insert("", "end", values=(
-                "E001", "невалидный фрагмент",
+            rows.append((
+                CODE_INVALID, "невалидный фрагмент",
                 line.split(" - ")[-1],
                 f"{idx}", file_path, "1"
             ))
 
     for idx, err in enumerate(errors, start=1):
-        output_table.insert("", "end", values=(
-            "E002", "Ошибка",
+        rows.append((
+            CODE_ERROR, "Ошибка",
             err,
             f"{idx}", file_path, "1"
         ))
 
-    if not report.strip() and not errors:
+    diagnostics_table.set_rows(rows)
+
+    no_errors = not report.strip() and not errors
+    if no_errors and '=' in cleaned_text:
+        expression = cleaned_text.split('=')[1].split(';')[0].strip()
+        if profiler is not None:
+            profiler.start("evaluate")
+        result = parse_and_evaluate_expression(expression)
+        if profiler is not None:
+            profiler.stop(len(expression.split()))
+    stage_timings.show(profiler)
+
+    if no_errors:
         if '=' in cleaned_text:
-            expression = cleaned_text.split('=')[1].split(';')[0].strip()
-            result = parse_and_evaluate_expression(expression)
             messagebox.showinfo("Результат", f"Ошибок не обнаружено.\n\nРезультат выражения: {result}")
         else:
             messagebox.showinfo("Результат", "Ошибок не обнаружено.")
@@ -296,7 +178,7 @@ def syntax_analysis():
     if current_tab and hasattr(current_tab, "text_area"):
         text = current_tab.text_area.get("1.0", tk.END).rstrip()
         file_path = getattr(current_tab, "file_path", "Без имени")
-        lexical_analyzer(text, file_path)
+        lexical_analyzer(text, file_path, stage_timings.new_profiler())
     else:
         messagebox.showerror("Ошибка", "Нет активного документа!") 
 
@@ -336,6 +218,7 @@ def select_all(text_area):
 
 def exit_program():
     """Выход из программы."""
+    saver.wait()
     root.quit()
 
 def delete_text(text_area):
@@ -385,6 +268,10 @@ menu_bar.add_cascade(label="Правка", menu=edit_menu)
 # Пуск
 run_menu = tk.Menu(menu_bar, tearoff=0)
 run_menu.add_command(label="Синтаксический анализ", command=syntax_analysis)
+# Замеры времени и памяти по этапам: итоги - в строке состояния
+profile_mode = tk.BooleanVar(value=False)
+run_menu.add_checkbutton(label="Замеры этапов", variable=profile_mode)
+run_menu.add_command(label="Экспорт замеров...", command=lambda: stage_timings.export())
 menu_bar.add_cascade(label="Пуск", menu=run_menu)
 
 # Справка
@@ -399,19 +286,8 @@ root.config(menu=menu_bar)
 # Панель инструментов
 toolbar = tk.Frame(root)
 
-# Загрузка изображений
-icons = {
-    "Создать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/new.png"),
-    "Открыть": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/open.png"),
-    "Сохранить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/save.png"),
-    "Сохранить как": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/save.png"), 
-    "Отменить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/undo.png"),
-    "Повторить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/redo.png"),
-    "Копировать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/copy.png"),
-    "Вырезать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/cut.png"),
-    "Вставить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/paste.png"),
-    "пуск": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/pusk.png"),
-}
+# Иконки кнопок загружаются после появления окна
+icon_loader = IconLoader(root)
 
 buttons = [
     ("Создать", create_document),
@@ -426,9 +302,9 @@ buttons = [
 ]
 
 for text, command in buttons:
-    btn = tk.Button(toolbar, image=icons.get(text), command=command)
-    btn.image = icons.get(text)
+    btn = tk.Button(toolbar, text=text, command=command)
     btn.pack(side=tk.LEFT, padx=2, pady=2)
+    icon_loader.add(btn, text)
 
 toolbar.pack(fill=tk.X)
 
@@ -457,6 +333,8 @@ LANGUAGES = {
         "delete": "Удалить",
         "select_all": "Выделить все",
         "syntax_analysis": "Синтаксический анализ",
+        "profile_mode": "Замеры этапов",
+        "export_profile": "Экспорт замеров...",
         "about": "О программе",
         "help_call": "Вызов справки",
     },
@@ -477,6 +355,8 @@ LANGUAGES = {
         "delete": "Delete",
         "select_all": "Select All",
         "syntax_analysis": "Syntax Analysis",
+        "profile_mode": "Stage Timings",
+        "export_profile": "Export Timings...",
         "about": "About",
         "help_call": "Help",
     },
@@ -510,6 +390,8 @@ def change_language(event=None):
     edit_menu.entryconfig(8, label=translation["select_all"])
 
     run_menu.entryconfig(0, label=translation["syntax_analysis"])
+    run_menu.entryconfig(1, label=translation["profile_mode"])
+    run_menu.entryconfig(2, label=translation["export_profile"])
 
     help_menu.entryconfig(0, label=translation["help_call"])
     help_menu.entryconfig(2, label=translation["about"])
@@ -523,6 +405,10 @@ language_menu.bind("<<ComboboxSelected>>", change_language)
 status_var = tk.StringVar()
 status_label = tk.Label(root, textvariable=status_var, relief=tk.SUNKEN, anchor="w")
 status_label.pack(side=tk.BOTTOM, fill=tk.X) 
+root.bind("<Escape>", lambda event: cancel_loading(notebook))
+
+# Фоновое сохранение файлов
+saver = BackgroundSaver(root)
 
 # Создание вкладок
 notebook = ttk.Notebook(root)
@@ -539,6 +425,19 @@ status_label_var = tk.StringVar()
 status_label = tk.Label(root, textvariable=status_label_var)
 status_label.pack()
 
+# Замеры этапов анализа: итоги - в строку состояния
+stage_timings = StageTimings(profile_mode, status_label_var)
+
+# Фильтр по коду ошибки и число строк в таблице
+filter_bar = tk.Frame(output_frame)
+filter_bar.pack(side=tk.TOP, fill=tk.X)
+tk.Label(filter_bar, text="Код:").pack(side=tk.LEFT, padx=2)
+code_filter = ttk.Combobox(filter_bar, values=("Все",) + DIAGNOSTIC_CODES, state="readonly", width=6)
+code_filter.set("Все")
+code_filter.pack(side=tk.LEFT, padx=2)
+diagnostics_info_var = tk.StringVar()
+tk.Label(filter_bar, textvariable=diagnostics_info_var).pack(side=tk.LEFT, padx=10)
+
 # Создание таблицы
 columns = ("code", "type", "lexeme", "position", "file_path", "line")
 output_table = ttk.Treeview(output_frame, columns=columns, show="headings")
@@ -566,21 +465,18 @@ output_table.configure(yscroll=scrollbar.set)
 output_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+# Виртуальная таблица: в Treeview выводятся только видимые строки
+diagnostics_table = DiagnosticsTable(output_table, scrollbar, diagnostics_info_var, max_rendered=200)
+code_filter.bind("<<ComboboxSelected>>", lambda event: diagnostics_table.set_filter(
+    None if code_filter.get() == "Все" else code_filter.get()))
+
 def check_unsaved_changes():
     """Проверяет наличие несохраненных изменений перед выходом или выполнением других операций."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
-        file_path = current_tab.file_path
-
-        current_text = text_area.get("1.0", tk.END).strip()
-        original_text = ""
-
-        if file_path and os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                original_text = file.read().strip()
+        loading = getattr(current_tab, "loader", None) is not None
 
-        if current_text != original_text:  # Если текст изменился
+        if not loading and is_modified(current_tab.text_area, current_tab.saved_hash):  # Если текст изменился
             response = messagebox.askyesnocancel("Несохраненные изменения", "Файл был изменен. Сохранить перед закрытием?")
             if response:  # Если нажата кнопка "Да"
                 save_document()
@@ -591,6 +487,7 @@ def check_unsaved_changes():
 def confirm_exit():
     """Подтверждение выхода из программы."""
     if check_unsaved_changes() is not None:
+        saver.wait()
         root.quit()
 
 def confirm_open_document():
@@ -608,11 +505,16 @@ root.protocol("WM_DELETE_WINDOW", confirm_exit)  # Обработка закры
 file_menu.entryconfig("Открыть", command=confirm_open_document)
 file_menu.entryconfig("Создать", command=confirm_create_document)
 
-# Установка иконки
-root.iconbitmap("C:/Users/nikit/Desktop/КР/icons/ico.ico")
+if "--startup-time" in sys.argv:
+    # Замер холодного старта (bench_startup.py): выход сразу после первой отрисовки окна
+    close_after_first_paint(root)
+else:
+    # Установка иконки окна и загрузка иконок кнопок - после появления окна
+    root.after_idle(lambda: set_window_icon(root))
+    icon_loader.start()
 
-# Запуск основного цикла приложения
-root.mainloop()
+    # Запуск основного цикла приложения
+    root.mainloop()
 
  
 
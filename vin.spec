@@ -1,11 +1,16 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Сборка в каталог (onedir): в отличие от одного exe, программа не
+# распаковывается во временный каталог при каждом запуске, поэтому
+# холодный старт быстрее. Иконки из каталога icons кладутся в сборку.
+# Проверка бюджета старта: python bench_startup.py --exe dist/vin/vin.exe
+import os
 
 
 a = Analysis(
     ['vin.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('icons', 'icons')] if os.path.isdir('icons') else [],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -19,16 +24,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='vin',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +38,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='vin',
+)
@@ -1,38 +1,126 @@
-import re
 import tkinter as tk
-from tkinter import messagebox, filedialog, PhotoImage
+from tkinter import messagebox, filedialog
 from tkinter import ttk
-import os
+import queue
+import sys
+import threading
+
+from editor import (BackgroundSaver, DiagnosticsTable, FileLoader, LineNumbers, StageTimings, cancel_loading,
+                    close_after_first_paint, content_hash, finish_loading, is_modified, start_save)
+from resources import IconLoader, set_window_icon
+
+# Анализатор (analyzer), пул процессов и профилировщик импортируются при
+# первом обращении, чтобы не задерживать появление окна
+
+# Кэш результатов анализа: повторный запуск на том же тексте не разбирает его заново
+def shared_cache():
+    """Кэш анализа процесса окна (analyzer.process_cache); создаётся при первом обращении."""
+    import analyzer
+    if analyzer.process_cache is None:
+        analyzer.init_process_cache()
+    return analyzer.process_cache
+
+# Пул процессов для больших документов создаётся при первом обращении
+statement_executor = None
+
+def statement_pool():
+    """Пул процессов для анализа операторов или None, если он недоступен.
+
+    Нужен запуск процессов через fork: при spawn рабочий процесс заново
+    выполняет этот модуль и открыл бы ещё одно окно. Где fork нет (Windows),
+    операторы разбираются в текущем процессе, а параллельную проверку
+    больших файлов даёт check.py --split.
+    """
+    global statement_executor
+    import multiprocessing
+    if statement_executor is None and "fork" in multiprocessing.get_all_start_methods():
+        from concurrent.futures import ProcessPoolExecutor
+        from analyzer import init_process_cache
+        statement_executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("fork"),
+                                                 initializer=init_process_cache)
+    return statement_executor
+
+def shutdown_statement_pool():
+    if statement_executor is not None:
+        statement_executor.shutdown(cancel_futures=True)
 
 def update_line_numbers(text_area, line_numbers):
-    """Обновление номеров строк."""
-    line_numbers.config(state=tk.NORMAL)
-    line_numbers.delete("1.0", tk.END)
-    line_count = text_area.index(tk.END).split(".")[0]
-    line_numbers.insert(tk.END, "\n".join(str(i) for i in range(1, int(line_count))))
-    line_numbers.config(state=tk.DISABLED)
+    """Обновление номеров строк (перерисовываются только видимые строки)."""
+    line_numbers.schedule_redraw()
 
 def on_text_change(event=None, text_area=None, line_numbers=None):
     """Обработчик изменения текста."""
     update_line_numbers(text_area, line_numbers)
 
+def on_document_edit(tab):
+    """Обработчик любой правки текста (в том числе вставки из меню и отмены)."""
+    tab.line_numbers.schedule_redraw()
+    live_diagnostics.schedule(tab)
+
+def read_lines(text_area, line_numbers):
+    """Тексты строк с указанными номерами; при большом числе строк текст читается целиком."""
+    if len(line_numbers) > 100:
+        lines = text_area.get("1.0", "end-1c").split("\n")
+        return [lines[line - 1] if line <= len(lines) else "" for line in line_numbers]
+    return [text_area.get(f"{line}.0", f"{line}.end") for line in line_numbers]
+
+def track_edits(text_area, document, on_change=None):
+    """Перехват команд insert/delete/replace текстового поля для учёта изменённых строк."""
+    widget = str(text_area)
+    original = widget + "_orig"
+    text_area.tk.call("rename", widget, original)
+
+    def line_of(index):
+        return int(text_area.tk.call(original, "index", index).split(".")[0])
+
+    def proxy(*args):
+        command = args[0] if args else None
+        if command not in ("insert", "delete", "replace"):
+            return text_area.tk.call((original,) + args)
+
+        last = line_of("end-1c")
+        first_line = min(line_of(args[1]), last)
+        if command == "insert":
+            removed = 0
+            chunks = args[2::2]
+        else:
+            end_index = args[2] if len(args) > 2 else f"{args[1]}+1c"
+            removed = max(min(line_of(end_index), last) - first_line, 0)
+            chunks = args[3::2] if command == "replace" else ()
+
+        result = text_area.tk.call((original,) + args)
+        document.splice(first_line, removed, sum(chunk.count("\n") for chunk in chunks))
+        # Страховка от нестандартных вызовов (несколько диапазонов в delete и т.п.)
+        line_count = line_of("end-1c")
+        if len(document.lines) != line_count:
+            document.reset(line_count)
+        if on_change is not None:
+            on_change()
+        return result
+
+    text_area.tk.createcommand(widget, proxy)
+
 def create_document():
     """Создание нового документа."""
+    from analyzer import IncrementalDocument
     new_tab = ttk.Frame(notebook)
     notebook.add(new_tab, text="Новый документ")
     
     frame = tk.Frame(new_tab)
     frame.pack(fill=tk.BOTH, expand=True)
     
-    line_numbers = tk.Text(frame, width=4, padx=3, takefocus=0, border=0, background="lightgray", state=tk.DISABLED)
-    line_numbers.pack(side=tk.LEFT, fill=tk.Y)
-    
     text_area = tk.Text(frame, undo=True, font=("Arial", selected_size.get()))
+    line_numbers = LineNumbers(frame, text_area)
+    line_numbers.pack(side=tk.LEFT, fill=tk.Y)
     text_area.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
     text_area.bind("<KeyRelease>", lambda event: on_text_change(event, text_area, line_numbers))
 
     new_tab.text_area = text_area
+    new_tab.line_numbers = line_numbers
     new_tab.file_path = None
+    new_tab.saved_hash = content_hash("")
+    new_tab.document = IncrementalDocument(cache=shared_cache())
+    track_edits(text_area, new_tab.document, lambda: on_document_edit(new_tab))
     
     update_line_numbers(text_area, line_numbers)
 
@@ -40,21 +128,30 @@ def open_document():
     """Открытие документа."""
     file_path = filedialog.askopenfilename(filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
     if file_path:
+        from analyzer import IncrementalDocument
         new_tab = ttk.Frame(notebook)
         notebook.add(new_tab, text=file_path.split("/")[-1])
         
         frame = tk.Frame(new_tab)
         frame.pack(fill=tk.BOTH, expand=True)
         
-        line_numbers = tk.Text(frame, width=4, padx=3, takefocus=0, border=0, background="lightgray", state=tk.DISABLED)
-        line_numbers.pack(side=tk.LEFT, fill=tk.Y)
-        
         text_area = tk.Text(frame, undo=True, font=("Arial", selected_size.get()))
+        line_numbers = LineNumbers(frame, text_area)
+        line_numbers.pack(side=tk.LEFT, fill=tk.Y)
         text_area.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
         text_area.bind("<KeyRelease>", lambda event: on_text_change(event, text_area, line_numbers))
+        new_tab.line_numbers = line_numbers
+        new_tab.document = IncrementalDocument(cache=shared_cache())
+        track_edits(text_area, new_tab.document, lambda: on_document_edit(new_tab))
         
-        with open(file_path, "r", encoding="utf-8") as file:
-            text_area.insert(tk.END, file.read())
+        new_tab.loader = FileLoader(
+            text_area, file_path,
+            on_progress=lambda done, total: status_var.set(
+                f"Загрузка {file_path.split('/')[-1]}: {done * 100 // max(total, 1)}% (Esc - отмена)"),
+            on_done=lambda cancelled, error: finish_loading(notebook, status_var, new_tab, cancelled, error),
+        )
+        new_tab.saved_hash = None
+        new_tab.loader.start()
         
         new_tab.text_area = text_area
         new_tab.file_path = file_path
@@ -65,11 +162,9 @@ def save_document():
     """Сохранить документ."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
         file_path = current_tab.file_path
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(text_area.get("1.0", tk.END))
+            start_save(saver, status_var, current_tab, file_path)
         else:
             save_document_as()
 
@@ -77,14 +172,10 @@ def save_document_as():
     """Сохранить документ с новым именем."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
         file_path = filedialog.asksaveasfilename(defaultextension=".txt", 
                                                    filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")])
         if file_path:
-            with open(file_path, "w", encoding="utf-8") as file:
-                file.write(text_area.get("1.0", tk.END))
-            notebook.tab(current_tab, text=file_path.split("/")[-1])
-            current_tab.file_path = file_path
+            start_save(saver, status_var, current_tab, file_path, notebook)
 
 def update_font_size(*args):
     """Обновить размер шрифта в активной вкладке, не меняя размер окна."""
@@ -92,6 +183,7 @@ def update_font_size(*args):
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
         current_tab.text_area.config(font=("Arial", size))
+        current_tab.line_numbers.schedule_redraw()
 
 def get_active_text_area():
     """Получить текстовое поле активной вкладки."""
@@ -115,222 +207,172 @@ def setup_hotkeys(root):
 
 
 
-import re
-import tkinter as tk
-from tkinter import messagebox, ttk
-
-# === Вспомогательная функция для токенизации ===
-def tokenize(expr):
-    tokens = []
-    i = 0
-    while i < len(expr):
-        if expr[i].isspace():
-            i += 1
-            continue
-        elif expr[i] in '+-*/()':
-            tokens.append(expr[i])
-            i += 1
-        elif expr[i].isdigit():
-            num = expr[i]
-            i += 1
-            while i < len(expr) and expr[i].isdigit():
-                num += expr[i]
-                i += 1
-            tokens.append(num)
-        else:
-            tokens.append(expr[i])
-            i += 1
-    return tokens
-
-# === Преобразование в ПОЛИЗ ===
-def to_poliz(tokens):
-    output = []
-    stack = []
-    precedence = {'+': 1, '-': 1, '*': 2, '/': 2}
-    for token in tokens:
-        if token.isdigit():
-            output.append(token)
-        elif token in '+-*/':
-            while stack and stack[-1] != '(' and precedence.get(stack[-1], 0) >= precedence[token]:
-                output.append(stack.pop())
-            stack.append(token)
-        elif token == '(':
-            stack.append(token)
-        elif token == ')':
-            while stack and stack[-1] != '(':
-                output.append(stack.pop())
-            if stack and stack[-1] == '(':
-                stack.pop()
-        elif token == 'EOF':
-            continue  # игнорируем EOF
-    while stack:
-        output.append(stack.pop())
-    return output
-
-# === Оценка ПОЛИЗ ===
-def evaluate_poliz(poliz):
-    stack = []
-    for token in poliz:
-        if token.isdigit():
-            stack.append(int(token))
-        elif token in '+-*/':
-            b = stack.pop()
-            a = stack.pop()
-            if token == '+':
-                stack.append(a + b)
-            elif token == '-':
-                stack.append(a - b)
-            elif token == '*':
-                stack.append(a * b)
-            elif token == '/':
-                stack.append(a // b)
-        else:
-            raise ValueError(f"Неверный токен: {token}")
-    if len(stack) != 1:
-        raise ValueError("Неверный ПОЛИЗ")
-    return stack[0]
-
-
-def evaluate_poliz(poliz):
-    stack = []
-    for token in poliz:
-        if token.isdigit():
-            stack.append(int(token))
-        elif token in '+-*/':
-            if len(stack) < 2:
-                raise ValueError("Недостаточно операндов для операции")
-            b = stack.pop()
-            a = stack.pop()
-            if token == '+': stack.append(a + b)
-            elif token == '-': stack.append(a - b)
-            elif token == '*': stack.append(a * b)
-            elif token == '/':
-                if b == 0:
-                    raise ZeroDivisionError("Деление на ноль")
-                stack.append(a // b)
-    if len(stack) != 1:
-        raise ValueError("Некорректное выражение")
-    return stack[0]
+def show_diagnostics(rows):
+    """Вывод строк диагностики в таблицу."""
+    diagnostics_table.set_rows(rows)
 
 
 # === Лексический и синтаксический анализ ===
-def lexical_analyzer(text, file_path):
-    def clean_and_report_invalid_fragments(text):
-        result = ''
-        invalid_fragments = []
-        for c in text:
-            if c.isdigit() or c in '+-*/() ':
-                result += c
-            else:
-                invalid_fragments.append(c)
-
-        report = ""
-        for idx, fragment in enumerate(invalid_fragments, 1):
-            report += f"{idx} удалённый фрагмент - {fragment}\n"
-        return report, result
-
-    class Parser:
-        def __init__(self, tokens):
-            self.tokens = tokens + ['EOF']
-            self.pos = 0
-            self.errors = []
-
-        def current(self):
-            return self.tokens[self.pos]
-
-        def match(self, expected):
-            if self.current() == expected:
-                self.pos += 1
-                return True
-            return False
-
-        def parse(self):
-            self.E()
-            if self.current() != 'EOF':
-                self.errors.append(f"лишний токен: '{self.current()}'")
-
-        def E(self):
-            self.T()
-            self.A()
-
-        def A(self):
-            if self.current() in ('+', '-'):
-                self.pos += 1
-                self.T()
-                self.A()
-
-        def T(self):
-            self.O()
-            self.B()
-
-        def B(self):
-            if self.current() in ('*', '/'):
-                self.pos += 1
-                self.O()
-                self.B()
-
-        def O(self):
-            if self.current().isdigit():
-                self.pos += 1
-            elif self.match('('):
-                self.E()
-                if not self.match(')'):
-                    self.errors.append("ожидалась закрывающая скобка ')'")
-            else:
-                self.errors.append(f"ожидался 'num' или '(', найдено: '{self.current()}'")
-                self.pos += 1
-
-    report, cleaned_text = clean_and_report_invalid_fragments(text)
-    tokens = tokenize(cleaned_text)
-    parser = Parser(tokens)
-    parser.parse()
-
-    for row in output_table.get_children():
-        output_table.delete(row)
-
-    for idx, line in enumerate(report.strip().split('\n'), start=1):
-        if line.strip():
-            output_table.insert("", "end", values=(
-                "E001", "невалидный фрагмент",
-                line.split(" - ")[-1],
-                f"{idx}", file_path, "1"
-            ))
-
-    for idx, err in enumerate(parser.errors, start=1):
-        output_table.insert("", "end", values=(
-            "E002", "Синтаксическая ошибка",
-            err,
-            f"{idx}", file_path, "1"
-        ))
-
-    if not report.strip() and not parser.errors:
+def lexical_analyzer(text, file_path, profiler=None):
+    from analyzer import analyze
+    analysis = analyze(text, file_path, cache=shared_cache(), profiler=profiler)
+    diagnostics = analysis["diagnostics"]
+    stage_timings.show(profiler)
+    show_diagnostics(diagnostics)
+
+    if not diagnostics:
         messagebox.showinfo("Результат", "Ошибок не обнаружено.")
-
-    if not report.strip() and not parser.errors:
-        poliz = to_poliz(parser.tokens[:-1])  # Убираем только добавленный 'EOF'
-        poliz_str = ' '.join(poliz)
+        poliz_str = ' '.join(analysis["poliz"])
+        if analysis["error"] is None:
+            messagebox.showinfo("Результат вычисления", f"ПОЛИЗ: {poliz_str}\nРезультат: {analysis['result']}")
+        else:
+            messagebox.showerror("Ошибка вычисления", analysis["error"])
+
+
+# === Построчный анализ с разбором только изменённых строк ===
+def incremental_analysis(current_tab, profiler=None):
+    text_area = current_tab.text_area
+    file_path = getattr(current_tab, "file_path", "Без имени")
+    document = current_tab.document
+    if profiler is not None:
+        profiler.start("statements")
+    analyzed = document.refresh(lambda lines: read_lines(text_area, lines), file_path, statement_pool())
+    if profiler is not None:
+        profiler.stop(len(analyzed))
+    rows = document.diagnostics(file_path)
+    stage_timings.show(profiler)
+    show_diagnostics(rows)
+
+    if not rows:
+        messagebox.showinfo("Результат", f"Ошибок не обнаружено.\nВычислено выражений: {len(document.results())}")
+
+
+# === Анализ документа по операторам ===
+def statement_analysis(current_tab, profiler=None):
+    """Каждый оператор до ';' - отдельное выражение; большие документы разбираются в пуле процессов."""
+    from analyzer import analyze_statements, split_statements, statement_rows
+    text = current_tab.text_area.get("1.0", "end-1c")
+    file_path = getattr(current_tab, "file_path", "Без имени")
+    analyses = analyze_statements(split_statements(text, "statement"), file_path, shared_cache(),
+                                  statement_pool(), profiler=profiler)
+    rows = statement_rows(analyses, file_path)
+    stage_timings.show(profiler)
+    show_diagnostics(rows)
+
+    if not rows:
+        messagebox.showinfo("Результат", f"Ошибок не обнаружено.\nВычислено выражений: {len(analyses)}")
+
+
+# === Анализ по мере ввода ===
+class LiveDiagnostics:
+    """Анализ при вводе в фоновом потоке.
+
+    Запуск откладывается на delay мс после последней правки, каждая правка
+    делает выполняющийся анализ устаревшим и прерывает его. Анализ ведёт
+    один фоновый поток; пока он занят, ждёт только последний запрос, более
+    ранние заменяются. Поток окна только снимает снимок текста и выводит
+    готовые результаты, которые забирает из очереди периодическим вызовом
+    через root.after.
+    """
+
+    def __init__(self, widget, delay=300, poll_interval=30):
+        self.widget = widget
+        self.delay = delay
+        self.poll_interval = poll_interval
+        self.after_id = None
+        self.generation = 0
+        self.results = queue.Queue()
+        self.pending = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.widget.after(self.poll_interval, self.poll)
+
+    def schedule(self, tab):
+        self.generation += 1
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        if live_mode.get():
+            self.after_id = self.widget.after(self.delay, lambda: self.start(tab))
+
+    def start(self, tab):
+        from analyzer import analyze, analyze_statements, error_rows, split_statements, statement_rows
+        self.after_id = None
+        generation = self.generation
+        cache = shared_cache()
+        file_path = getattr(tab, "file_path", "Без имени")
+        cancelled = lambda: generation != self.generation
+
+        if statement_mode.get():
+            text = tab.text_area.get("1.0", "end-1c")
+            job = lambda: analyze_statements(split_statements(text, "statement"), file_path,
+                                             cache, cancelled=cancelled)
+            finish = lambda analyses: statement_rows(analyses, file_path)
+        elif line_mode.get():
+            document = tab.document
+            version, texts = document.snapshot(lambda lines: read_lines(tab.text_area, lines))
+            job = lambda: document.analyze_lines(texts, file_path, cancelled)
+            finish = lambda analyses: document.diagnostics(file_path) if document.apply(version, analyses) else None
+        else:
+            text = tab.text_area.get("1.0", tk.END).rstrip()
+            job = lambda: analyze(text, file_path, cache=cache, cancelled=cancelled)
+            finish = lambda analysis: error_rows(analysis, file_path)
+
+        with self.condition:
+            self.pending = (generation, tab, job, finish)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation, tab, job, finish = self.pending
+                self.pending = None
+            if generation != self.generation:
+                continue
+            try:
+                result = job()
+            except Exception:
+                continue  # поток должен пережить сбой одного запуска; результата просто не будет
+            if result is not None:
+                self.results.put((generation, tab, finish, result))
+
+    def poll(self):
         try:
-            result = evaluate_poliz(poliz)
-            messagebox.showinfo("Результат вычисления", f"ПОЛИЗ: {poliz_str}\nРезультат: {result}")
-        except Exception as e:
-            messagebox.showerror("Ошибка вычисления", str(e))
-
-    
+            while True:
+                generation, tab, finish, result = self.results.get_nowait()
+                if generation != self.generation or notebook.select() != str(tab):
+                    continue
+                rows = finish(result)
+                if rows is not None:
+                    show_diagnostics(rows)
+        except queue.Empty:
+            pass
+        self.widget.after(self.poll_interval, self.poll)
 
 
 # === Основная функция, вызываемая из GUI ===
 def syntax_analysis():
     current_tab = notebook.nametowidget(notebook.select())
-    if current_tab and hasattr(current_tab, "text_area"):
+    if current_tab and hasattr(current_tab, "text_area") and statement_mode.get():
+        statement_analysis(current_tab, stage_timings.new_profiler())
+    elif current_tab and hasattr(current_tab, "text_area") and line_mode.get():
+        incremental_analysis(current_tab, stage_timings.new_profiler())
+    elif current_tab and hasattr(current_tab, "text_area"):
         text = current_tab.text_area.get("1.0", tk.END).rstrip()
         file_path = getattr(current_tab, "file_path", "Без имени")
+        from analyzer import to_poliz
         try:
             poliz = to_poliz(text)
             poliz_str = ' '.join(poliz)
             messagebox.showinfo("Постфиксная форма (ПОЛИЗ)", poliz_str)
         except Exception as e:
             messagebox.showerror("Ошибка ПОЛИЗ", str(e))
-        lexical_analyzer(text, file_path)
+        lexical_analyzer(text, file_path, stage_timings.new_profiler())
     else:
         messagebox.showerror("Ошибка", "Нет активного документа!")
 
@@ -373,6 +415,8 @@ def select_all(text_area):
 
 def exit_program():
     """Выход из программы."""
+    saver.wait()
+    shutdown_statement_pool()
     root.quit()
 
 def delete_text(text_area):
@@ -422,6 +466,19 @@ menu_bar.add_cascade(label="Правка", menu=edit_menu)
 # Пуск
 run_menu = tk.Menu(menu_bar, tearoff=0)
 run_menu.add_command(label="Синтаксический анализ", command=syntax_analysis)
+# Построчный режим: каждая строка - отдельное выражение, разбираются только изменённые строки
+line_mode = tk.BooleanVar(value=False)
+run_menu.add_checkbutton(label="Построчный анализ", variable=line_mode)
+# Анализ по операторам: каждый фрагмент до ';' - отдельное выражение
+statement_mode = tk.BooleanVar(value=False)
+run_menu.add_checkbutton(label="Анализ по операторам (;)", variable=statement_mode)
+# Анализ при вводе: диагностика обновляется в фоне после паузы в наборе
+live_mode = tk.BooleanVar(value=False)
+run_menu.add_checkbutton(label="Анализ при вводе", variable=live_mode)
+# Замеры времени и памяти по этапам: итоги - в строке состояния
+profile_mode = tk.BooleanVar(value=False)
+run_menu.add_checkbutton(label="Замеры этапов", variable=profile_mode)
+run_menu.add_command(label="Экспорт замеров...", command=lambda: stage_timings.export())
 menu_bar.add_cascade(label="Пуск", menu=run_menu)
 
 # Справка
@@ -436,19 +493,8 @@ root.config(menu=menu_bar)
 # Панель инструментов
 toolbar = tk.Frame(root)
 
-# Загрузка изображений
-icons = {
-    "Создать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/new.png"),
-    "Открыть": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/open.png"),
-    "Сохранить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/save.png"),
-    "Сохранить как": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/save.png"), 
-    "Отменить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/undo.png"),
-    "Повторить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/redo.png"),
-    "Копировать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/copy.png"),
-    "Вырезать": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/cut.png"),
-    "Вставить": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/paste.png"),
-    "пуск": PhotoImage(file="C:/Users/nikit/Desktop/КР/icons/pusk.png"),
-}
+# Иконки кнопок загружаются после появления окна
+icon_loader = IconLoader(root)
 
 buttons = [
     ("Создать", create_document),
@@ -463,9 +509,9 @@ buttons = [
 ]
 
 for text, command in buttons:
-    btn = tk.Button(toolbar, image=icons.get(text), command=command)
-    btn.image = icons.get(text)
+    btn = tk.Button(toolbar, text=text, command=command)
     btn.pack(side=tk.LEFT, padx=2, pady=2)
+    icon_loader.add(btn, text)
 
 toolbar.pack(fill=tk.X)
 
@@ -494,6 +540,11 @@ LANGUAGES = {
         "delete": "Удалить",
         "select_all": "Выделить все",
         "syntax_analysis": "Синтаксический анализ",
+        "line_mode": "Построчный анализ",
+        "statement_mode": "Анализ по операторам (;)",
+        "live_mode": "Анализ при вводе",
+        "profile_mode": "Замеры этапов",
+        "export_profile": "Экспорт замеров...",
         "about": "О программе",
         "help_call": "Вызов справки",
     },
@@ -514,6 +565,11 @@ LANGUAGES = {
         "delete": "Delete",
         "select_all": "Select All",
         "syntax_analysis": "Syntax Analysis",
+        "line_mode": "Line-by-Line Analysis",
+        "statement_mode": "Analyze Each Statement (;)",
+        "live_mode": "Analyze While Typing",
+        "profile_mode": "Stage Timings",
+        "export_profile": "Export Timings...",
         "about": "About",
         "help_call": "Help",
     },
@@ -547,6 +603,11 @@ def change_language(event=None):
     edit_menu.entryconfig(8, label=translation["select_all"])
 
     run_menu.entryconfig(0, label=translation["syntax_analysis"])
+    run_menu.entryconfig(1, label=translation["line_mode"])
+    run_menu.entryconfig(2, label=translation["statement_mode"])
+    run_menu.entryconfig(3, label=translation["live_mode"])
+    run_menu.entryconfig(4, label=translation["profile_mode"])
+    run_menu.entryconfig(5, label=translation["export_profile"])
 
     help_menu.entryconfig(0, label=translation["help_call"])
     help_menu.entryconfig(2, label=translation["about"])
@@ -560,6 +621,10 @@ language_menu.bind("<<ComboboxSelected>>", change_language)
 status_var = tk.StringVar()
 status_label = tk.Label(root, textvariable=status_var, relief=tk.SUNKEN, anchor="w")
 status_label.pack(side=tk.BOTTOM, fill=tk.X) 
+root.bind("<Escape>", lambda event: cancel_loading(notebook))
+
+# Фоновое сохранение файлов
+saver = BackgroundSaver(root)
 
 # Создание вкладок
 notebook = ttk.Notebook(root)
@@ -576,6 +641,19 @@ status_label_var = tk.StringVar()
 status_label = tk.Label(root, textvariable=status_label_var)
 status_label.pack()
 
+# Замеры этапов анализа: итоги - в строку состояния
+stage_timings = StageTimings(profile_mode, status_label_var)
+
+# Фильтр по коду ошибки и число строк в таблице
+filter_bar = tk.Frame(output_frame)
+filter_bar.pack(side=tk.TOP, fill=tk.X)
+tk.Label(filter_bar, text="Код:").pack(side=tk.LEFT, padx=2)
+code_filter = ttk.Combobox(filter_bar, values=("Все", "E001", "E002", "E003", "E004"), state="readonly", width=6)
+code_filter.set("Все")
+code_filter.pack(side=tk.LEFT, padx=2)
+diagnostics_info_var = tk.StringVar()
+tk.Label(filter_bar, textvariable=diagnostics_info_var).pack(side=tk.LEFT, padx=10)
+
 # Создание таблицы
 columns = ("code", "type", "lexeme", "position", "file_path", "line")
 output_table = ttk.Treeview(output_frame, columns=columns, show="headings")
@@ -603,21 +681,21 @@ output_table.configure(yscroll=scrollbar.set)
 output_table.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
+# Виртуальная таблица: в Treeview выводятся только видимые строки
+diagnostics_table = DiagnosticsTable(output_table, scrollbar, diagnostics_info_var, max_rendered=200)
+code_filter.bind("<<ComboboxSelected>>", lambda event: diagnostics_table.set_filter(
+    None if code_filter.get() == "Все" else code_filter.get()))
+
+# Фоновая диагностика при вводе
+live_diagnostics = LiveDiagnostics(root)
+
 def check_unsaved_changes():
     """Проверяет наличие несохраненных изменений перед выходом или выполнением других операций."""
     current_tab = notebook.nametowidget(notebook.select())
     if current_tab and hasattr(current_tab, "text_area"):
-        text_area = current_tab.text_area
-        file_path = current_tab.file_path
-
-        current_text = text_area.get("1.0", tk.END).strip()
-        original_text = ""
-
-        if file_path and os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as file:
-                original_text = file.read().strip()
+        loading = getattr(current_tab, "loader", None) is not None
 
-        if current_text != original_text:  # Если текст изменился
+        if not loading and is_modified(current_tab.text_area, current_tab.saved_hash):  # Если текст изменился
             response = messagebox.askyesnocancel("Несохраненные изменения", "Файл был изменен. Сохранить перед закрытием?")
             if response:  # Если нажата кнопка "Да"
                 save_document()
@@ -628,6 +706,8 @@ def check_unsaved_changes():
 def confirm_exit():
     """Подтверждение выхода из программы."""
     if check_unsaved_changes() is not None:
+        saver.wait()
+        shutdown_statement_pool()
         root.quit()
 
 def confirm_open_document():
@@ -645,11 +725,16 @@ root.protocol("WM_DELETE_WINDOW", confirm_exit)  # Обработка закры
 file_menu.entryconfig("Открыть", command=confirm_open_document)
 file_menu.entryconfig("Создать", command=confirm_create_document)
 
-# Установка иконки
-root.iconbitmap("C:/Users/nikit/Desktop/КР/icons/ico.ico")
+if "--startup-time" in sys.argv:
+    # Замер холодного старта (bench_startup.py): выход сразу после первой отрисовки окна
+    close_after_first_paint(root)
+else:
+    # Установка иконки окна и загрузка иконок кнопок - после появления окна
+    root.after_idle(lambda: set_window_icon(root))
+    icon_loader.start()
 
-# Запуск основного цикла приложения
-root.mainloop()
+    # Запуск основного цикла приложения
+    root.mainloop()
 
  
 